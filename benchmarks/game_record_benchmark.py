@@ -0,0 +1,177 @@
+""" Microbenchmark of the memory and time of the Game entities on the bulk paths, per 100k games.
+
+Cases:
+    - read: build the games of the database as entities. Previous `Game` (with a per-instance `__dict__`) vs slotted `Game`.
+      Slotted games only hold less memory: building them is not faster (it is up to ~10% slower on small databases).
+    - write: build the parameters of the bulk insert of `upsert_many()` and insert them into an in-memory table.
+      Dicts (`to_create_db_dict()`, previous) vs tuples (`to_create_db_tuple()`).
+    - export: stream the CSV rows of all categories. A list per row (previous) vs the tuples of the cursor.
+
+For each case, it reports the time and the memory allocated by Python (tracemalloc): the memory still held by
+the built objects for read and write, and the peak while streaming for export.
+
+Usage:
+    python -m benchmarks.game_record_benchmark [--games N] [--rounds N]
+"""
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from dataclasses import make_dataclass, field, fields
+
+from models.game import Game
+from repositories.game_repository import GameRepository
+from database.database_controller import DatabaseController
+
+
+GAMES = 100_000
+ROUNDS = 3
+CATEGORIES = 12
+CATEGORIES_PER_GAME = 3
+GAMES_PER_BATCH = 1000
+
+# Game entity before it was slotted: the same dataclass, with a per-instance __dict__
+PreviousGame = make_dataclass("PreviousGame", [(game_field.name, game_field.type, field(default=game_field.default)) for game_field in fields(Game)])
+
+
+def create_games(games: int) -> list[Game]:
+    generator = random.Random(0)
+    categories_names = [f"Category {index}" for index in range(CATEGORIES)]
+    return [
+        Game(
+            website_id=website_id,
+            name=f"Game {website_id}",
+            description=f"Description of the game {website_id}",
+            price=generator.randint(500, 9999) / 100,
+            image_url=f"https://example.com/assets/category-{website_id % CATEGORIES}_800.jpg",
+            has_stock=generator.random() > 0.1,
+            url=f"https://example.com/products/{website_id}",
+            categories=generator.sample(categories_names, k=CATEGORIES_PER_GAME),
+        )
+        for website_id in range(1, games + 1)
+    ]
+
+
+def measure(function, rounds: int, keep_result: bool) -> tuple[float, float]:
+    """ Run the function `rounds` times. Returns the best time and the memory allocated by the last run, in MB:
+    the memory still held by its result if `keep_result`, or its peak otherwise.
+    """
+    best_seconds = float("inf")
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        function()
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = function()
+    current_memory, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best_seconds, (current_memory if keep_result else peak_memory) / 1_000_000
+
+
+def read_games(connection: sqlite3.Connection, game_class: type) -> list:
+    """ Build the entities as `get_games_by_category_name()` does: one query for the games, another one for their categories."""
+    categories_names_by_game_id = {}
+    for game_id, category_name in connection.execute(
+        "SELECT gc.game_id, c.name FROM game_category gc INNER JOIN categories c ON c.id = gc.category_id"
+    ):
+        categories_names_by_game_id.setdefault(game_id, []).append(category_name)
+
+    return [
+        game_class(
+            id=game_id, website_id=website_id, name=name, description=description, price=price, image_url=image_url,
+            has_stock=has_stock, url=url, sale_price=sale_price, categories=categories_names_by_game_id.get(game_id),
+        )
+        for game_id, website_id, name, description, price, image_url, has_stock, url, sale_price in connection.execute(
+            "SELECT id, website_id, name, description, price, image_url, has_stock, url, sale_price FROM games ORDER BY id"
+        )
+    ]
+
+
+def write_games(games: list[Game], use_tuples: bool) -> list:
+    """ Build the parameters of the bulk insert of the games, and insert them into an in-memory table."""
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE games (website_id INTEGER, name TEXT, description TEXT, price REAL, sale_price REAL, image_url TEXT, has_stock BOOLEAN, url TEXT, fingerprint TEXT)"
+    )
+    fingerprint = "0" * 64 # Same for both cases: the fingerprints are not part of the comparison
+    if use_tuples:
+        parameters = [(*game.to_create_db_tuple(), fingerprint) for game in games]
+        connection.executemany("INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", parameters)
+    else:
+        parameters = [{**game.to_create_db_dict(), "fingerprint": fingerprint} for game in games]
+        connection.executemany(
+            """
+                INSERT INTO games (website_id, name, description, price, sale_price, image_url, has_stock, url, fingerprint)
+                VALUES (:website_id, :name, :description, :price, :sale_price, :image_url, :has_stock, :url, :fingerprint)
+            """,
+            parameters
+        )
+    connection.close()
+    return parameters
+
+
+def export_previous_rows(game_repository: GameRepository) -> int:
+    """ Stream the export rows as before: a new list per row, with the stock status computed in Python."""
+    exported_rows = 0
+    for category_name, name, price, stock_status, url in game_repository.iter_games_rows_by_category():
+        row = [name, price, Game.get_stock_status(has_stock=stock_status == "In Stock"), url]
+        row.insert(0, category_name)
+        exported_rows += 1
+    return exported_rows
+
+
+def export_rows(game_repository: GameRepository) -> int:
+    exported_rows = 0
+    for _ in game_repository.iter_games_rows_by_category():
+        exported_rows += 1
+    return exported_rows
+
+
+def run_benchmark(games: int, rounds: int, work_dir: Path) -> list[dict]:
+    games_entities = create_games(games=games)
+    database_controller = DatabaseController(db_name="benchmark.db", path=str(work_dir))
+    connection = database_controller.connect()
+    database_controller.database_initialization()
+    game_repository = GameRepository(connection=connection)
+    for index in range(0, games, GAMES_PER_BATCH):
+        game_repository.upsert_many(games=games_entities[index:index + GAMES_PER_BATCH])
+
+    cases = [
+        ("read", "previous Game", lambda: read_games(connection=connection, game_class=PreviousGame), True),
+        ("read", "slotted Game", lambda: read_games(connection=connection, game_class=Game), True),
+        ("write", "dicts", lambda: write_games(games=games_entities, use_tuples=False), True),
+        ("write", "tuples", lambda: write_games(games=games_entities, use_tuples=True), True),
+        ("export", "lists", lambda: export_previous_rows(game_repository=game_repository), False),
+        ("export", "tuples", lambda: export_rows(game_repository=game_repository), False),
+    ]
+    try:
+        results = []
+        for case_name, variant, function, keep_result in cases:
+            seconds, memory_mb = measure(function=function, rounds=rounds, keep_result=keep_result)
+            scale = 100_000 / games
+            results.append({"case": case_name, "variant": variant, "ms_per_100k": seconds * 1000 * scale, "mb_per_100k": memory_mb * scale})
+        return results
+    finally:
+        database_controller.disconnect()
+
+
+def print_results(results: list[dict]) -> None:
+    print(f"{'Case':<8}{'Variant':<16}{'ms / 100k':>12}{'MB / 100k':>12}")
+    for result in results:
+        print(f"{result['case']:<8}{result['variant']:<16}{result['ms_per_100k']:>12.1f}{result['mb_per_100k']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the memory and time of the Game entities on the bulk paths.")
+    parser.add_argument("--games", type=int, default=GAMES, help="Number of games of the benchmark database")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="Times each case runs (the best time is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        print_results(run_benchmark(games=args.games, rounds=args.rounds, work_dir=Path(work_dir)))
@@ -0,0 +1,161 @@
+""" Local stand-in for the sandbox website, serving a synthetic catalogue of games and their images.
+
+Listing pages reproduce the markup read by the product parsers (`product-card`, `pagination`, `srcset`...),
+so the scraper can crawl them as if they were the real website, without network access.
+"""
+import math
+import random
+import pyvips
+import threading
+from html import escape
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+GAMES_PER_PAGE = 32
+CATEGORIES = 12
+IMAGE_SIZE = 800 # Width and height of the generated images
+IMAGE_WIDTHS = (200, 400, IMAGE_SIZE) # Widths of each image listed in the `srcset` of the cards
+CATEGORIES_PER_GAME = 3
+OUT_OF_STOCK_RATE = 0.1
+
+class SyntheticCatalogue:
+    """ Deterministic catalogue of games, split in listing pages.
+
+    Games are named and priced from their website id, and each one has a few categories. As in the real website,
+    game images are named after the category assets, so many games share the same image.
+    """
+
+    def __init__(self, games: int, games_per_page: int = GAMES_PER_PAGE, categories: int = CATEGORIES, seed: int = 0):
+        self.games = games
+        self.games_per_page = games_per_page
+        self.categories_names = [f"Category {index}" for index in range(categories)]
+        self.pages = max(1, math.ceil(games / games_per_page))
+        self.seed = seed
+        self.images_cache: dict[str, bytes] = {}
+        self.images_lock = threading.Lock()
+
+    def get_page_html(self, page_number: int) -> str:
+        """ Get the HTML of a listing page. Pages beyond the last one have no products nor pagination."""
+        if page_number < 1 or page_number > self.pages:
+            return "<html><body><p>No products found</p></body></html>"
+
+        first_game = (page_number - 1) * self.games_per_page
+        last_game = min(first_game + self.games_per_page, self.games)
+        cards = "\n".join(self._get_card_html(website_id=website_id) for website_id in range(first_game + 1, last_game + 1))
+        next_button_class = "next disabled" if page_number == self.pages else "next"
+        return f"""<!DOCTYPE html>
+<html>
+<head><title>Products - page {page_number}</title></head>
+<body>
+<div class="products-list">
+{cards}
+</div>
+<ul class="pagination">
+<li class="previous"><a href="/products?page={max(1, page_number - 1)}">Previous</a></li>
+<li class="{next_button_class}"><a href="/products?page={page_number + 1}">Next</a></li>
+</ul>
+</body>
+</html>"""
+
+    def get_image(self, image_name: str) -> bytes | None:
+        """ Get the JPEG of an image asset (e.g. "category-3_800"), generating it on first use."""
+        asset_name, _, width = image_name.rpartition("_")
+        if not asset_name.startswith("category-") or not width.isdigit() or int(width) not in IMAGE_WIDTHS:
+            return None
+
+        with self.images_lock:
+            if image_name not in self.images_cache:
+                self.images_cache[image_name] = self._create_image(asset_name=asset_name, width=int(width))
+            return self.images_cache[image_name]
+
+    def _get_card_html(self, website_id: int) -> str:
+        generator = random.Random(self.seed * 1_000_003 + website_id)
+        categories = generator.sample(self.categories_names, k=min(CATEGORIES_PER_GAME, len(self.categories_names)))
+        price = f"{generator.randint(5, 99)},{generator.choice(['99', '49', '00'])} €"
+        asset_name = f"category-{self.categories_names.index(categories[0])}"
+        srcset = ", ".join(f"/assets/{asset_name}_{width}.jpg {width}w" for width in IMAGE_WIDTHS)
+        categories_html = "".join(f"<span>{escape(category)}</span>" for category in categories)
+        out_of_stock_html = '<p class="out-of-stock">Out of Stock</p>' if generator.random() < OUT_OF_STOCK_RATE else ""
+
+        return f"""<div class="product-card css-e8at8d eag3qlw10">
+<a class="card-header css-o171kl eag3qlw2" href="/products/{website_id}"><h4 class="title css-7u5e79 eag3qlw7">Game {website_id}</h4></a>
+<p class="category css-8fdgzc eag3qlw8">{categories_html}</p>
+<p class="description css-1pfy4ae eag3qlw9">Synthetic game {website_id} of the benchmark catalogue.</p>
+<div class="price-wrapper css-li4v8k eag3qlw4">{price}</div>
+{out_of_stock_html}
+<img class="image css-1a9hn0w" src="/assets/{asset_name}_{IMAGE_WIDTHS[0]}.jpg" srcset="{srcset}" alt="Game {website_id}"/>
+</div>"""
+
+    def _create_image(self, asset_name: str, width: int) -> bytes:
+        """ Create a noisy image (noise keeps the decoder busy, unlike flat images), different for each asset."""
+        seed = sum(map(ord, asset_name))
+        bands = [pyvips.Image.gaussnoise(width, width, mean=64 + (seed * (band + 1)) % 128, sigma=40) for band in range(3)]
+        image = bands[0].bandjoin(bands[1:]).cast("uchar").copy(interpretation="srgb")
+        return image.jpegsave_buffer(Q=85)
+
+
+class LocalSite:
+    """ HTTP server of the synthetic catalogue, on a free local port, in a background thread.
+
+    Serves `/products?page=N` (listing pages), `/products/ID` (product pages) and `/assets/NAME.jpg` (images).
+    Use it as a context manager: the server is stopped on exit.
+    """
+
+    def __init__(self, catalogue: SyntheticCatalogue, host: str = "127.0.0.1", port: int = 0):
+        self.catalogue = catalogue
+        self.server = ThreadingHTTPServer((host, port), self._create_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="local-site", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "LocalSite":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def _create_handler(self) -> type[BaseHTTPRequestHandler]:
+        catalogue = self.catalogue
+
+        class CatalogueRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, as the real website
+
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                if url.path == "/products":
+                    page_number = parse_qs(url.query).get("page", ["1"])[0]
+                    page_html = catalogue.get_page_html(page_number=int(page_number) if page_number.isdigit() else 1)
+                    self._send(body=page_html.encode(), content_type="text/html; charset=utf-8")
+
+                elif url.path.startswith("/products/"):
+                    self._send(body=f"<html><body><h2>{escape(url.path)}</h2></body></html>".encode(), content_type="text/html; charset=utf-8")
+
+                elif url.path.startswith("/assets/") and url.path.endswith(".jpg"):
+                    image = catalogue.get_image(image_name=url.path.removeprefix("/assets/").removesuffix(".jpg"))
+                    if image is None:
+                        self._send(body=b"Not found", content_type="text/plain", status=404)
+                    else:
+                        self._send(body=image, content_type="image/jpeg")
+
+                else:
+                    self._send(body=b"Not found", content_type="text/plain", status=404)
+
+            def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass # Do not log every request
+
+        return CatalogueRequestHandler
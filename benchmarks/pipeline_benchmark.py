@@ -0,0 +1,226 @@
+""" Offline benchmark of each stage of the scraper, against a local stand-in for the sandbox website.
+
+Stages:
+    - crawl: fetch all listing pages over HTTP.
+    - parse: parse the fetched pages into Game entities.
+    - upsert: save the games of each page in a new database.
+    - scrape: the whole `WebScraper.scrape_web()` (crawl, parse and upsert), on another new database, fetching `--concurrency`
+      pages at a time over HTTP. Pages fetched past the last one are served without products, so no browser is needed offline.
+    - images: download, resize and save the images of all games.
+    - export: write the CSV of all categories.
+
+For each stage, it reports the throughput (pages/s, games/s, images/s, rows/s), the p50/p95 latency of its
+unit of work (a page for crawl, parse and upsert) and the peak RSS of the process (and its resize workers) so far.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark [--games N] [--games-per-page N] [--concurrency N] [--json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+from models.game import Game
+from scraper.scraper import WebScraper
+from scraper.page_loader import HttpPageLoader
+from csv_writer.csv_writer import CSVWriter
+from image_processor.image_procesor import ImageProcessor, DOWNLOAD_CONCURRENCY
+from repositories.game_repository import GameRepository
+from database.database_controller import DatabaseController
+from benchmarks.local_site import SyntheticCatalogue, LocalSite, GAMES_PER_PAGE, CATEGORIES
+
+
+GAMES = 2000
+CRAWL_CONCURRENCY = 4
+
+@dataclass
+class StageResult:
+    """ Work done by a stage, and the time it took."""
+    stage: str
+    seconds: float
+    pages: int = 0
+    games: int = 0
+    images: int = 0
+    rows: int = 0
+    latencies: list[float] = field(default_factory=list, repr=False) # Seconds of each unit of work (e.g. a page)
+    peak_rss_mb: float = 0.0
+
+    def to_report(self) -> dict:
+        report = {key: value for key, value in asdict(self).items() if key != "latencies"}
+        for unit in ("pages", "games", "images", "rows"):
+            report[f"{unit}_per_second"] = getattr(self, unit) / self.seconds if self.seconds else 0.0
+        report["p50_ms"] = get_percentile(self.latencies, percentile=50) * 1000 if self.latencies else None
+        report["p95_ms"] = get_percentile(self.latencies, percentile=95) * 1000 if self.latencies else None
+        return report
+
+
+def get_percentile(values: list[float], percentile: int) -> float:
+    sorted_values = sorted(values)
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * percentile // 100)]
+
+
+def get_peak_rss_mb() -> float:
+    """ Peak RSS of this process, or of its largest finished child process (e.g. a resize worker), in MB."""
+    peak_rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak_rss_kb / 1024 # ru_maxrss is in KiB on Linux
+
+
+def timed(function, *args, **kwargs) -> tuple[object, float]:
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+
+def run_crawl_stage(site_url: str, pages: int, concurrency: int) -> tuple[StageResult, list[str]]:
+    http_loader = HttpPageLoader(pool_size=concurrency)
+    pages_urls = [f"{site_url}/products?page={page_number}" for page_number in range(1, pages + 1)]
+    try:
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            loaded_pages = list(executor.map(lambda url: timed(http_loader.load, url=url), pages_urls))
+        seconds = time.perf_counter() - start_time
+    finally:
+        http_loader.close()
+
+    pages_html = [html for html, _ in loaded_pages]
+    result = StageResult(stage="crawl", seconds=seconds, pages=len(pages_html), latencies=[latency for _, latency in loaded_pages])
+    return result, pages_html
+
+
+def run_parse_stage(scraper: WebScraper, pages_html: list[str]) -> tuple[StageResult, list[list[Game]]]:
+    start_time = time.perf_counter()
+    parsed_pages = [timed(scraper._parse_page, html=html, page_number=page_number) for page_number, html in enumerate(pages_html, start=1)]
+    seconds = time.perf_counter() - start_time
+
+    pages_games = [games for (games, _), _ in parsed_pages]
+    result = StageResult(
+        stage="parse",
+        seconds=seconds,
+        pages=len(pages_games),
+        games=sum(len(games) for games in pages_games),
+        latencies=[latency for _, latency in parsed_pages],
+    )
+    return result, pages_games
+
+
+def run_upsert_stage(game_repository: GameRepository, pages_games: list[list[Game]]) -> StageResult:
+    start_time = time.perf_counter()
+    latencies = [timed(game_repository.upsert_many, games=games)[1] for games in pages_games]
+    seconds = time.perf_counter() - start_time
+    return StageResult(stage="upsert", seconds=seconds, pages=len(pages_games), games=sum(len(games) for games in pages_games), latencies=latencies)
+
+
+def run_scrape_stage(scraper: WebScraper) -> StageResult:
+    _, seconds = timed(scraper.scrape_web)
+    upsert_stats = scraper.game_repository.get_upsert_stats()
+    return StageResult(stage="scrape", seconds=seconds, pages=scraper.page_number, games=sum(upsert_stats.values()))
+
+
+def run_images_stage(image_processor: ImageProcessor, images_data: list[tuple[str, int]]) -> StageResult:
+    _, seconds = timed(image_processor.save_all_games_images, images_data=images_data)
+    return StageResult(stage="images", seconds=seconds, games=len(images_data), images=len(images_data))
+
+
+def run_export_stage(game_repository: GameRepository) -> StageResult:
+    exported_rows = 0
+    def count_rows(rows):
+        nonlocal exported_rows
+        for row in rows:
+            exported_rows += 1
+            yield row
+
+    with open(os.devnull, "w", newline="") as output, redirect_stdout(output):
+        csv_writer = CSVWriter() # Writes to the redirected standard output
+        _, seconds = timed(csv_writer.write_all_games, rows_by_category=count_rows(game_repository.iter_games_rows_by_category()))
+    return StageResult(stage="export", seconds=seconds, rows=exported_rows)
+
+
+def run_benchmark(args: argparse.Namespace, work_dir: Path) -> list[StageResult]:
+    catalogue = SyntheticCatalogue(games=args.games, games_per_page=args.games_per_page, categories=args.categories)
+    results = []
+    with LocalSite(catalogue=catalogue) as site:
+        database_controller = DatabaseController(db_name="benchmark.db", path=str(work_dir))
+        connection = database_controller.connect()
+        database_controller.database_initialization()
+        game_repository = GameRepository(connection=connection)
+        scraper = WebScraper(game_repository=game_repository, concurrency=args.concurrency, fetch_mode="http", main_url=site.url)
+
+        scrape_database_controller = DatabaseController(db_name="benchmark_scrape.db", path=str(work_dir))
+        scrape_connection = scrape_database_controller.connect()
+        scrape_database_controller.database_initialization()
+        scrape_game_repository = GameRepository(connection=scrape_connection)
+        full_scraper = WebScraper(game_repository=scrape_game_repository, concurrency=args.concurrency, fetch_mode="http", main_url=site.url)
+
+        image_processor = ImageProcessor(
+            path_of_images=str(work_dir / "images"),
+            concurrency=args.image_workers,
+            resize_workers=args.resize_workers,
+        )
+
+        try:
+            crawl_result, pages_html = run_crawl_stage(site_url=site.url, pages=catalogue.pages, concurrency=args.concurrency)
+            parse_result, pages_games = run_parse_stage(scraper=scraper, pages_html=pages_html)
+            stages = [
+                lambda: crawl_result,
+                lambda: parse_result,
+                lambda: run_upsert_stage(game_repository=game_repository, pages_games=pages_games),
+                lambda: run_scrape_stage(scraper=full_scraper),
+                lambda: run_images_stage(image_processor=image_processor, images_data=game_repository.get_images_url_and_product_id() or []),
+                lambda: run_export_stage(game_repository=game_repository),
+            ]
+            for run_stage in stages:
+                result = run_stage()
+                result.peak_rss_mb = get_peak_rss_mb()
+                results.append(result)
+        finally:
+            database_controller.disconnect()
+            scrape_database_controller.disconnect()
+
+    return results
+
+
+def print_results(results: list[StageResult]) -> None:
+    print(f"{'Stage':<8}{'Seconds':>9}{'Pages/s':>10}{'Games/s':>10}{'Images/s':>10}{'Rows/s':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}{'Peak RSS (MB)':>15}")
+    for result in results:
+        report = result.to_report()
+        latencies = "".join(f"{report[key]:>10.2f}" if report[key] is not None else f"{'-':>10}" for key in ("p50_ms", "p95_ms"))
+        print(
+            f"{report['stage']:<8}{report['seconds']:>9.2f}{report['pages_per_second']:>10.1f}{report['games_per_second']:>10.1f}"
+            f"{report['images_per_second']:>10.1f}{report['rows_per_second']:>11.1f}{latencies}{report['peak_rss_mb']:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the scraper against a local synthetic catalogue.")
+    parser.add_argument("--games", type=int, default=GAMES, help="Number of games of the catalogue")
+    parser.add_argument("--games-per-page", type=int, default=GAMES_PER_PAGE, help="Number of games of each listing page")
+    parser.add_argument("--categories", type=int, default=CATEGORIES, help="Number of categories (and of unique images) of the catalogue")
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY, help="Listing pages fetched in parallel")
+    parser.add_argument("--image-workers", type=int, default=DOWNLOAD_CONCURRENCY, help="Images downloaded in parallel")
+    parser.add_argument("--resize-workers", type=int, default=None, help="Processes resizing images (0 resizes in the download threads)")
+    parser.add_argument("--work-dir", type=Path, help="Directory for the databases and images. A temporary directory is used if not given")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON instead of a table")
+    parser.add_argument("--verbose", action="store_true", help="Show the logs of the stages")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+
+    if args.work_dir:
+        args.work_dir.mkdir(parents=True, exist_ok=True)
+        stages_results = run_benchmark(args=args, work_dir=args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            stages_results = run_benchmark(args=args, work_dir=Path(work_dir))
+
+    if args.json:
+        print(json.dumps([result.to_report() for result in stages_results], indent=2))
+    else:
+        print_results(stages_results)
@@ -0,0 +1,128 @@
+""" Benchmark of the thumbnail generation: decode-then-resize (previous path) vs shrink-on-load (current path).
+
+Each path runs in its own subprocess over the same image corpus, so the peak RSS of one does not affect the other.
+
+Usage:
+    python -m benchmarks.thumbnail_benchmark [--corpus DIR] [--images N] [--rounds N]
+
+Without `--corpus`, a synthetic corpus of JPEG images is generated in a temporary directory.
+"""
+import sys
+import json
+import time
+import pyvips
+import random
+import resource
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+from image_processor.image_procesor import SIZES
+from image_processor.image_resizer import ENCODER_OPTIONS, init_resize_worker, resize_and_save_images
+
+
+CORPUS_IMAGES = 30
+CORPUS_IMAGE_SIZES = [(1200, 900), (2400, 1800), (4000, 3000)] # Width, height of the synthetic images
+IMAGE_FORMATS = ('.jpg', '.jpeg', '.png', '.svg')
+ROUNDS = 3
+
+
+def decode_and_resize_images(image_content: bytes, path_to_save: str, filenames_by_size: dict[int, str]) -> float:
+    """ Previous path: decode the image at full resolution, then resize the decoded image to each size."""
+    start_time = time.perf_counter()
+
+    website_image = pyvips.Image.new_from_buffer(image_content, "")
+    for size in filenames_by_size:
+        resized_image = website_image.thumbnail_image(size, height=size, crop='centre')
+        resized_image.write_to_file(str(Path(path_to_save) / filenames_by_size[size]), **ENCODER_OPTIONS)
+
+    return time.perf_counter() - start_time
+
+
+def shrink_on_load_images(image_content: bytes, path_to_save: str, filenames_by_size: dict[int, str]) -> float:
+    """ Current path: decode the image downscaled to the largest size, then resize each size from it."""
+    decode_seconds, encode_seconds = resize_and_save_images(image_content, path_to_save, filenames_by_size)
+    return decode_seconds + encode_seconds
+
+
+RESIZE_PATHS = {
+    "decode_and_resize": decode_and_resize_images,
+    "shrink_on_load": shrink_on_load_images,
+}
+
+
+def create_corpus(corpus_dir: Path, images: int) -> None:
+    """ Create a corpus of noisy JPEG images (noise keeps the decoder busy, unlike flat images)."""
+    for index in range(images):
+        width, height = CORPUS_IMAGE_SIZES[index % len(CORPUS_IMAGE_SIZES)]
+        bands = [pyvips.Image.gaussnoise(width, height, mean=128, sigma=random.randint(20, 60)) for _ in range(3)]
+        image = bands[0].bandjoin(bands[1:]).cast("uchar").copy(interpretation="srgb")
+        image.write_to_file(str(corpus_dir / f"image_{index}.jpg"), Q=90)
+
+
+def run_resize_path(path_name: str, corpus_dir: Path, rounds: int) -> dict:
+    """ Resize all the images of the corpus with a path. Runs in the benchmark subprocess."""
+    init_resize_worker()
+    resize_path = RESIZE_PATHS[path_name]
+    images_contents = [image_path.read_bytes() for image_path in sorted(corpus_dir.iterdir()) if image_path.suffix in IMAGE_FORMATS]
+    filenames_by_size = {size: f"{size}x{size}.jpg" for size in sorted(SIZES, reverse=True)}
+
+    images_seconds = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for _ in range(rounds):
+            for image_content in images_contents:
+                images_seconds.append(resize_path(image_content, output_dir, filenames_by_size))
+
+    images_seconds.sort()
+    return {
+        "path": path_name,
+        "images": len(images_seconds),
+        "total_seconds": sum(images_seconds),
+        "p50_ms": images_seconds[len(images_seconds) // 2] * 1000,
+        "p95_ms": images_seconds[int(len(images_seconds) * 0.95)] * 1000,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # ru_maxrss is in KiB on Linux
+    }
+
+
+def run_benchmark(corpus_dir: Path, rounds: int) -> list[dict]:
+    """ Run each resize path in its own subprocess and collect its results."""
+    results = []
+    for path_name in RESIZE_PATHS:
+        completed_process = subprocess.run(
+            [sys.executable, "-m", "benchmarks.thumbnail_benchmark", "--run-path", path_name, "--corpus", str(corpus_dir), "--rounds", str(rounds)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(completed_process.stdout.splitlines()[-1]))
+    return results
+
+
+def print_results(results: list[dict]) -> None:
+    print(f"{'Path':<20}{'Images':>8}{'Total (s)':>12}{'p50 (ms)':>10}{'p95 (ms)':>10}{'Peak RSS (MB)':>15}")
+    for result in results:
+        print(
+            f"{result['path']:<20}{result['images']:>8}{result['total_seconds']:>12.2f}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['peak_rss_mb']:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the time and peak RSS of the thumbnail generation paths.")
+    parser.add_argument("--corpus", type=Path, help="Directory with the images to resize. A synthetic corpus is generated if not given")
+    parser.add_argument("--images", type=int, default=CORPUS_IMAGES, help="Number of images of the synthetic corpus")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="Times each image is resized")
+    parser.add_argument("--run-path", choices=list(RESIZE_PATHS), help=argparse.SUPPRESS) # Used by the benchmark subprocesses
+    args = parser.parse_args()
+
+    if args.run_path:
+        print(json.dumps(run_resize_path(path_name=args.run_path, corpus_dir=args.corpus, rounds=args.rounds)))
+
+    elif args.corpus:
+        print_results(run_benchmark(corpus_dir=args.corpus, rounds=args.rounds))
+
+    else:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            create_corpus(corpus_dir=Path(corpus_dir), images=args.images)
+            print_results(run_benchmark(corpus_dir=Path(corpus_dir), rounds=args.rounds))
@@ -1,14 +1,42 @@
 import csv
 import sys
+from typing import Iterable
 from models.game import Game
+from metrics.registry import MetricsRegistry, metrics_registry
 class CSVWriter():
-    def __init__(self):
+    def __init__(self, metrics: MetricsRegistry|None = None):
         self.writer = csv.writer(sys.stdout) # Initialize CSV writer to write to standard output (terminal)
+        self.metrics = metrics or metrics_registry
     
     def write(self, data:list[str]) -> None:
         """Write a row of data to the CSV output."""
         self.writer.writerow(data)
     
+    def write_rows(self, rows:Iterable[tuple]) -> None:
+        """Write all rows of data to the CSV output, consuming them one by one."""
+        self.writer.writerows(rows)
+    
+    def write_all_games(self, rows_by_category:Iterable[tuple]) -> None:
+        """Write the header row and the games data of all categories to the CSV output, and flush it.
+        
+        Rows are expected to be already grouped and ordered by category (see `GameRepository.iter_games_rows_by_category()`).
+        The number of rows and the time spent writing them are recorded in the metrics.
+        """
+        with self.metrics.timer("export_seconds", format="stdout"):
+            self.write_headers(Game.get_fields_name())
+            self.write_rows(self._count_rows(rows_by_category))
+            self.flush()
+    
+    def _count_rows(self, rows:Iterable[tuple]) -> Iterable[tuple]:
+        """Yield the rows, recording the number of exported rows in the metrics."""
+        exported_rows = 0
+        try:
+            for row in rows:
+                exported_rows += 1
+                yield row
+        finally:
+            self.metrics.increment("export_rows_total", exported_rows, format="stdout")
+
     def write_headers(self, headers:list[str]) -> None:
         """Write the header row to the CSV output."""
         self.writer.writerow(headers)
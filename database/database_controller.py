@@ -2,11 +2,31 @@ import sqlite3
 import logging
 from pathlib import Path
 
+from database.migrations import MIGRATIONS
+
+
+# SQLite settings applied to every connection, tuned for a single writer doing bulk writes.
+PERFORMANCE_PROFILE = {
+    "journal_mode": "WAL", # Readers do not block the writer, and commits do not rewrite the whole journal
+    "synchronous": "NORMAL", # Safe with WAL: a power loss can only lose the last commits, never corrupt the database
+    "cache_size": -64000, # Page cache of 64 MB (negative values are in KiB)
+    "mmap_size": 268435456, # Memory-map up to 256 MB of the database file
+    "temp_store": "MEMORY", # Keep temporary tables and indexes (e.g. for ORDER BY) in memory
+}
+
 class DatabaseController:
-    def __init__(self, db_name: str = 'games.db', path:str = 'data'):
+    def __init__(
+        self,
+        db_name: str = 'games.db',
+        path:str = 'data',
+        performance_profile: dict | None = PERFORMANCE_PROFILE,
+        check_same_thread: bool = True,
+    ):
         self.target_dir = Path(path)
         self.target_dir.mkdir(parents=True, exist_ok=True)
         self.db_path = self.target_dir / db_name
+        self.performance_profile = performance_profile or {} # PRAGMA name -> value applied on connection. None keeps SQLite defaults
+        self.check_same_thread = check_same_thread # False allows sharing the connection between threads (serializing its use)
         self.connection = None
         self.logger = logging.getLogger(__name__)
 
@@ -16,7 +36,8 @@ class DatabaseController:
         try:
             self.logger.info("🔌 Connecting to the database...")
             if self.connection is None:
-                self.connection = sqlite3.connect(str(self.db_path))
+                self.connection = sqlite3.connect(str(self.db_path), check_same_thread=self.check_same_thread)
+                self._apply_performance_profile()
 
             self.logger.info("✅ Database connected successfully.")
             return self.connection
@@ -24,6 +45,15 @@ class DatabaseController:
             self.logger.error(f"❌ Error connecting to database: {e}")
             raise
 
+    def _apply_performance_profile(self) -> None:
+        """Apply the PRAGMAs of the performance profile to the connection."""
+
+        for pragma_name, pragma_value in self.performance_profile.items():
+            self.connection.execute(f"PRAGMA {pragma_name} = {pragma_value}")
+
+        if self.performance_profile:
+            self.logger.info(f"⚡ Database performance profile applied: {self.performance_profile}")
+
     def disconnect(self) -> None:
         """Closes the connection to the SQLite database."""
         self.logger.info("🔚 Closing database connection...")
@@ -41,6 +71,8 @@ class DatabaseController:
         - games
         - categories
         - game_category (table for many-to-many relationship between games and categories)
+
+        Then, applies the pending schema migrations (using `_apply_migrations()` method).
         """
 
         if not self.connection:
@@ -88,4 +120,29 @@ class DatabaseController:
         )
 
         self.connection.commit()
+        self._apply_migrations()
         self.logger.info("✅ Database initialized and tables created successfully.")
+
+    def _apply_migrations(self) -> None:
+        """Apply the migrations newer than the database version, upgrading the database in place.
+
+        The database version is stored in SQLite's `user_version`. Each migration is applied in its own transaction,
+        together with the update of the version, so a failed migration leaves the database in its previous version.
+        """
+
+        current_version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        pending_migrations = [migration for migration in MIGRATIONS if migration.version > current_version]
+
+        for migration in sorted(pending_migrations, key=lambda migration: migration.version):
+            self.logger.info(f"🛠️  Applying database migration {migration.version}: {migration.description}...")
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute("BEGIN")
+                for statement in migration.statements:
+                    cursor.execute(statement)
+                cursor.execute(f"PRAGMA user_version = {migration.version}")
+                self.connection.commit()
+            except sqlite3.Error as e:
+                self.connection.rollback()
+                self.logger.error(f"❌ Error applying database migration {migration.version}: {e}")
+                raise
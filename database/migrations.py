@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class Migration:
+    """A versioned change of the database schema.
+
+    Migrations are applied in order of version to databases whose `user_version` is lower than their version,
+    so existing databases are upgraded in place. Once released, a migration must never be modified:
+    new changes must be added as a new migration with the next version.
+    """
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+MIGRATIONS = (
+    Migration(
+        version=1,
+        description="Add indexes for game lookups by website id and games by category",
+        statements=(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_games_website_id ON games (website_id);",
+            "CREATE INDEX IF NOT EXISTS idx_game_category_category_id ON game_category (category_id);",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="Add content fingerprint of games, to skip writing unchanged games",
+        statements=(
+            "ALTER TABLE games ADD COLUMN fingerprint TEXT;",
+        ),
+    ),
+    Migration(
+        version=3,
+        description="Add crawl runs, to resume interrupted scrapings",
+        statements=(
+            """
+                CREATE TABLE IF NOT EXISTS crawl_runs
+                    (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        status TEXT NOT NULL,
+                        last_completed_page INTEGER NOT NULL DEFAULT 0,
+                        started_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        finished_at TEXT
+                    );
+            """,
+        ),
+    ),
+)
@@ -0,0 +1,99 @@
+import csv
+import json
+from pathlib import Path
+from typing import Iterable
+
+
+WRITE_BUFFER_SIZE = 1024 * 1024 # Bytes buffered in memory before each write to the file
+COLUMNAR_BATCH_ROWS = 65_536 # Rows converted to columns and written at once by the columnar formats
+
+class CsvFileFormat:
+    """ Comma separated values, with a header row. The same output as the CSV of the terminal, but in a file."""
+
+    extension = "csv"
+
+    def write(self, file_path: Path, headers: list[str], rows: Iterable[tuple]) -> int:
+        """ Write the headers and the rows to the file, and return the number of rows written."""
+        written_rows = 0
+        with open(file_path, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as file:
+            writer = csv.writer(file)
+            writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+                written_rows += 1
+        return written_rows
+
+
+class NdjsonFileFormat:
+    """ Newline delimited JSON: one JSON object per row, with the headers as keys."""
+
+    extension = "ndjson"
+
+    def write(self, file_path: Path, headers: list[str], rows: Iterable[tuple]) -> int:
+        written_rows = 0
+        with open(file_path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as file:
+            for row in rows:
+                file.write(json.dumps(dict(zip(headers, row)), ensure_ascii=False))
+                file.write("\n")
+                written_rows += 1
+        return written_rows
+
+
+class ParquetFileFormat:
+    """ Columnar Parquet file, written with pyarrow in batches of `COLUMNAR_BATCH_ROWS` rows.
+
+    Prices are stored as doubles, and the other columns as strings.
+    """
+
+    extension = "parquet"
+
+    def __init__(self):
+        try:
+            import pyarrow # Optional dependency, only imported if a columnar format is used
+        except ImportError as e:
+            raise ImportError(f"The {self.extension} export format requires pyarrow, which is not installed. Install it with `pip install pyarrow`.") from e
+        self.pyarrow = pyarrow
+
+    def write(self, file_path: Path, headers: list[str], rows: Iterable[tuple]) -> int:
+        schema = self.pyarrow.schema([(header, self.pyarrow.float64() if header == "price" else self.pyarrow.string()) for header in headers])
+        written_rows = 0
+        with self._open_writer(file_path=file_path, schema=schema) as writer:
+            columns = [[] for _ in headers]
+            for row in rows:
+                for column, value in zip(columns, row):
+                    column.append(value)
+                written_rows += 1
+                if len(columns[0]) == COLUMNAR_BATCH_ROWS:
+                    writer.write_batch(self.pyarrow.record_batch(columns, schema=schema))
+                    columns = [[] for _ in headers]
+
+            if columns[0] or not written_rows:
+                writer.write_batch(self.pyarrow.record_batch(columns, schema=schema))
+        return written_rows
+
+    def _open_writer(self, file_path: Path, schema):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(str(file_path), schema)
+
+
+class ArrowFileFormat(ParquetFileFormat):
+    """ Columnar Arrow IPC file (also known as Feather v2), which can be memory-mapped by the readers without parsing it."""
+
+    extension = "arrow"
+
+    def _open_writer(self, file_path: Path, schema):
+        return self.pyarrow.ipc.new_file(str(file_path), schema)
+
+
+FILE_FORMATS = {
+    "csv": CsvFileFormat,
+    "ndjson": NdjsonFileFormat,
+    "parquet": ParquetFileFormat,
+    "arrow": ArrowFileFormat,
+}
+
+def get_file_format(name: str) -> CsvFileFormat|NdjsonFileFormat|ParquetFileFormat|ArrowFileFormat:
+    """ Get the writer of the given file format. Columnar formats raise an ImportError if pyarrow is not installed."""
+    if name not in FILE_FORMATS:
+        raise ValueError(f"Invalid export format '{name}'. Valid formats are: {', '.join(FILE_FORMATS)}")
+    return FILE_FORMATS[name]()
@@ -0,0 +1,156 @@
+import os
+import re
+import time
+import logging
+import threading
+from pathlib import Path
+from sqlite3 import Connection
+from dataclasses import dataclass
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from models.game import Game
+from metrics.registry import MetricsRegistry, metrics_registry
+from repositories.game_repository import GameRepository
+from exporters.file_formats import get_file_format
+
+
+EXPORTS_PATH = 'data/exports'
+EXPORT_LAYOUTS = ("combined", "per-category")
+EXPORT_WORKERS = 4 # Categories exported in parallel, each with its own database connection
+COMBINED_FILE_NAME = "games"
+
+@dataclass
+class ExportResult:
+    """ Files written by an export, with their total number of rows and the time it took."""
+    files: list[Path]
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class GameExporter:
+    """ Export the games of all categories to files in `path`, as CSV, NDJSON, Parquet or Arrow (see `file_formats`).
+
+    Layouts:
+        - "combined": a single `games.{extension}` file with the games of all categories, grouped by category.
+        - "per-category": a `categories/{category}.{extension}` file per category. Categories are exported in parallel
+          by `workers` threads, each reading with its own connection from `connection_factory` (created with `check_same_thread=False`).
+
+    Files are written to a temporary file that replaces the previous export only once complete, so readers never
+    see a partially written file. Rows have the same fields as the CSV of the terminal (see `Game.get_fields_name()`).
+    """
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], Connection],
+        file_format: str = "csv",
+        layout: str = "combined",
+        path: str = EXPORTS_PATH,
+        workers: int = EXPORT_WORKERS,
+        metrics: MetricsRegistry|None = None,
+    ):
+        if layout not in EXPORT_LAYOUTS:
+            raise ValueError(f"Invalid export layout '{layout}'. Valid layouts are: {', '.join(EXPORT_LAYOUTS)}")
+
+        # Creates a connection to the games database for each export thread. They are all closed by the thread calling `export()`
+        self.connection_factory = connection_factory
+        self.file_format_name = file_format
+        self.file_format = get_file_format(name=file_format)
+        self.layout = layout
+        self.target_dir = Path(path)
+        self.workers = max(1, workers)
+        self.metrics = metrics or metrics_registry
+        self.thread_data = threading.local()
+        self.connections: list[Connection] = []
+        self.connections_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def export(self) -> ExportResult:
+        """ Export the games in the configured format and layout, and log the number of rows exported per second."""
+        self.logger.info(f"📤 ⏳ Exporting games as {self.file_format_name} ({self.layout})...")
+        start_time = time.perf_counter()
+        try:
+            if self.layout == "combined":
+                exported_files = [self._export_file(file_name=COMBINED_FILE_NAME, category_name=None)]
+            else:
+                exported_files = self._export_categories()
+        finally:
+            self._close_connections()
+
+        result = ExportResult(
+            files=[file_path for file_path, _ in exported_files],
+            rows=sum(rows for _, rows in exported_files),
+            seconds=time.perf_counter() - start_time,
+        )
+        self.logger.info(
+            f"✅ Exported {result.rows} rows to {len(result.files)} {self.file_format_name} files in {self.target_dir} "
+            f"in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/s)"
+        )
+        return result
+
+    def _export_categories(self) -> list[tuple[Path, int]]:
+        """ Export each category to its own file, in parallel."""
+        categories_names = self._get_game_repository().get_categories_names() or []
+        files_names = self._get_files_names(categories_names=categories_names)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export") as executor:
+            return list(executor.map(
+                lambda category_name: self._export_file(file_name=f"categories/{files_names[category_name]}", category_name=category_name),
+                categories_names,
+            ))
+
+    def _export_file(self, file_name: str, category_name: str | None) -> tuple[Path, int]:
+        """ Write the games of the category (of all categories, if None) to a file, atomically. Returns its path and number of rows."""
+        file_path = self.target_dir / f"{file_name}.{self.file_format.extension}"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file_path = file_path.with_name(f".{file_path.name}.tmp")
+
+        rows = self._get_game_repository().iter_games_rows_by_category(category_name=category_name)
+        try:
+            with self.metrics.timer("export_file_seconds", format=self.file_format_name):
+                exported_rows = self.file_format.write(file_path=temporary_file_path, headers=Game.get_fields_name(), rows=rows)
+            os.replace(temporary_file_path, file_path)
+        except Exception:
+            temporary_file_path.unlink(missing_ok=True)
+            self.metrics.increment("export_errors_total", format=self.file_format_name)
+            raise
+
+        self.metrics.increment("export_rows_total", exported_rows, format=self.file_format_name)
+        return file_path, exported_rows
+
+    def _get_files_names(self, categories_names: list[str]) -> dict[str, str]:
+        """ Get a file name (without extension) for each category, e.g. "Action & Adventure" -> "action_adventure".
+
+        Categories whose names only differ in case or symbols get a numeric suffix, so each one has its own file.
+        """
+        files_names = {}
+        used_files_names = set()
+        for category_name in categories_names:
+            base_file_name = re.sub(r"\W+", "_", category_name.lower()).strip("_") or "category"
+            file_name, suffix = base_file_name, 2
+            while file_name in used_files_names:
+                file_name, suffix = f"{base_file_name}_{suffix}", suffix + 1
+            used_files_names.add(file_name)
+            files_names[category_name] = file_name
+        return files_names
+
+    def _get_game_repository(self) -> GameRepository:
+        """ Get the repository of the calling thread, connecting to the database on first use (SQLite connections can not be shared between threads)."""
+        game_repository = getattr(self.thread_data, "game_repository", None)
+        if game_repository is None:
+            connection = self.connection_factory()
+            with self.connections_lock:
+                self.connections.append(connection)
+            game_repository = self.thread_data.game_repository = GameRepository(connection=connection, metrics=self.metrics)
+        return game_repository
+
+    def _close_connections(self) -> None:
+        with self.connections_lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.thread_data = threading.local()
@@ -1,16 +1,64 @@
-import pyvips
+import os
+import time
 import shutil
 import logging
 import requests
+import threading
+import multiprocessing
 from pathlib import Path
+from functools import partial
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from http import HTTPStatus
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from metrics.registry import MetricsRegistry, metrics_registry
+from rate_control.retry_queue import RetryQueue
+from rate_control.rate_controller import RateController, RetryableRequestError, RETRYABLE_STATUS_CODES, get_retry_delay
+from image_processor.image_store import ImageStore
+from repositories.image_cache_repository import ImageCacheRepository
+from image_processor.image_resizer import ENCODER_OPTIONS, init_resize_worker, resize_and_save_images
 
 
 SIZES = [100, 500, 2000]
+DOWNLOAD_CONCURRENCY = 8 # Images downloaded and saved in parallel
+DOWNLOAD_TIMEOUT = 10
+DOWNLOAD_MAX_RETRIES = 3 # Retries of the images of a game whose download failed with a retryable error
+RESIZE_QUEUE_SIZE = 32 # Max downloaded images waiting to be resized. When full, downloads wait for the resize workers
+
 class ImageProcessor():
 
-    def __init__(self, path_of_images:str = 'data/images'):
+    def __init__(
+        self,
+        path_of_images:str = 'data/images',
+        concurrency:int = DOWNLOAD_CONCURRENCY,
+        max_retries:int = DOWNLOAD_MAX_RETRIES,
+        resize_workers:int|None = None,
+        resize_queue_size:int = RESIZE_QUEUE_SIZE,
+        image_cache_repository: ImageCacheRepository|None = None,
+        encoder_options: dict|None = None,
+        rate_controller: RateController|None = None,
+        metrics: MetricsRegistry|None = None,
+    ):
         self.target_dir = Path(path_of_images)
         self.target_dir.mkdir(parents=True, exist_ok=True)
+        self.encoder_options = {**ENCODER_OPTIONS, **(encoder_options or {})} # JPEG encoder options (quality, strip, interlace)
+        # Each unique image is downloaded and resized once. Images saved with other encoder options are stored apart
+        self.image_store = ImageStore(path=self.target_dir / "_store" / self._get_store_variant_name())
+        self.image_cache_repository = image_cache_repository # HTTP validators of the images. None always downloads missing images
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        # Processes resizing images. None uses one per core, 0 resizes in the download threads (using libvips threading)
+        self.resize_workers = (os.cpu_count() or 1) if resize_workers is None else resize_workers
+        self.resize_slots = threading.BoundedSemaphore(resize_queue_size)
+        self.resize_executor: ProcessPoolExecutor|None = None
+        self.progress_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stage_stats = self._create_stage_stats()
+        self.metrics = metrics or metrics_registry
+        # Paces the downloads of each host. Share it with the scraper to apply the same limits to pages and images
+        self.rate_controller = rate_controller or RateController(metrics=self.metrics)
+        self.retry_queue = RetryQueue() # Games whose images download failed with a retryable error, waiting for their backoff
         self.logger = logging.getLogger(__name__) 
         logging.getLogger('pyvips').setLevel(logging.WARNING) # Reduce log level to WARNING to avoid too many logs from pyvips
     
@@ -19,57 +67,307 @@ class ImageProcessor():
 
         This method uses requests.Session to optimize HTTP requests for downloading images, 
         reusing HTTP connections and avoiding redundant handshakes every time an image is being downloaded.
+
+        Images are downloaded in parallel by a pool of `concurrency` threads sharing the session, whose connection
+        pool is sized to keep one connection per thread open to the images host. Downloaded images are resized
+        and saved by a separate pool of processes (see `resize_pool()`), so network waits and CPU work overlap.
+        Downloads failing with a retryable error are retried once all games are processed (see `retry_failed_images()`).
         """
-        self.logger.info("🖼️ ⏳Starting to save all game images...")
+        self.logger.info(f"🖼️ ⏳Starting to save all game images with {self.concurrency} download workers and {self.resize_workers} resize workers...")
         total_images = len(images_data)
+        started_images = 0
+        self.stage_stats = self._create_stage_stats()
+        start_time = time.perf_counter()
+
+        def save_game_images_task(image_url: str, game_id: int) -> None:
+            nonlocal started_images
+
+            # Log progress for every 100 images processed to give feedback to the user
+            with self.progress_lock:
+                started_images += 1
+                index = started_images
+            if index % 100 == 1:
+                end_range = index + 100 - 1
+                if end_range > total_images:
+                    end_range = total_images
+                self.logger.info(f"📥 Downloading and saving images from range {index}-{end_range}")
+
+            self.save_game_images(session=session, image_url=image_url, game_id=game_id)
+
+        with self.create_session() as session, self.resize_pool(), ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="image-download") as executor:
+            for _ in executor.map(lambda image_data: save_game_images_task(*image_data), images_data):
+                pass
+            self.retry_failed_images(session=session)
+
+        self.log_stages_throughput(elapsed_seconds=time.perf_counter() - start_time)
+        self.logger.info("✅ All game images have been processed and saved.")
+
+    @contextmanager
+    def resize_pool(self):
+        """ Start the pool of processes that resize and save the downloaded images.
+
+        While the pool is open, `save_game_images()` hands the downloaded images to it instead of resizing them
+        in the calling thread. On exit, it waits until all pending images are resized and saved.
+        Processes are started with "spawn", as forking a process that already runs libvips threads is not safe.
+        """
+        if self.resize_workers == 0 or self.resize_executor is not None:
+            yield
+            return
+
+        self.resize_executor = ProcessPoolExecutor(
+            max_workers=self.resize_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_resize_worker,
+        )
+        try:
+            yield
+        finally:
+            self.resize_executor.shutdown(wait=True)
+            self.resize_executor = None
+
+    def log_stages_throughput(self, elapsed_seconds: float) -> None:
+        """ Log the number of images, work time and throughput of the download and resize stages."""
+        with self.stats_lock:
+            for stage_name, stage_stats in self.stage_stats.items():
+                throughput = stage_stats["images"] / elapsed_seconds if elapsed_seconds else 0.0
+                self.logger.info(
+                    f"⏱️ {stage_name.capitalize()} stage: {stage_stats['images']} images ({stage_stats['bytes'] / 1_000_000:.1f} MB) "
+                    f"in {stage_stats['seconds']:.1f}s of work. Throughput: {throughput:.2f} images/s over {elapsed_seconds:.1f}s"
+                )
+
+        store_stats = self.image_store.get_stats()
+        self.logger.info(
+            f"♻️ Image store: {store_stats['downloads_saved']} downloads and {store_stats['resizes_saved']} resizes saved by reusing stored images. "
+            f"{store_stats['not_modified']} images not modified since the last download"
+        )
+        self.rate_controller.log_state()
 
-        with requests.Session() as session:
-            for index, (image_url, game_id) in enumerate(images_data, start=1):
-
-                # Log progress for every 100 images processed to give feedback to the user
-                if index % 100 == 1:
-                    end_range = index + 100 - 1
-                    if end_range > total_images:
-                        end_range = total_images
-                    self.logger.info(f"📥 Downloading and saving images from range {index}-{end_range}")
-
-                try:
-                    if not self._check_valid_image_url(url=image_url):
-                        self.logger.warning(f"⚠️ Game {game_id} has an invalid image URL format, can not save image. Skipping....")
-                        continue
-
-                    category_name = self._get_category_name_from_url(image_url=image_url)
-                    game_path = self.target_dir / f"game_{game_id}"
-                    # Check if images already exists to avoid re-downloading
-                    if game_path.is_dir():
-                        
-                        # Check if images already match
-                        images_exists = self._check_if_images_matches(category_name=category_name, game_id=game_id, game_path=game_path)
-                        if images_exists:
-                            continue # Skip to game if images already exists
-
-                        else:
-                            # Images exists but do not match, so we delete the old images to re-download
-                            self.logger.info(f"Images for game ID {game_id} changed. Deleting old images and re-downloading.")
-                            shutil.rmtree(game_path)  # Remove existing directory with old images
-
-                    game_path.mkdir(parents=True, exist_ok=True)
-                    response = session.get(image_url, timeout=10)
-                    response.raise_for_status()
-         
-                    # Creates a pyvips image from the downloaded content
-                    website_image = pyvips.Image.new_from_buffer(response.content, "")
-
-                    for size in SIZES:
-                        filename = self._create_filename(category_name=category_name, game_id=game_id, size=size)
-                        resized_image = self._resize_image(image=website_image, new_size=size)
-                        self._save_image(image=resized_image, path_to_save=game_path, filename=filename)
-
-                except Exception as e:
-                    self.logger.error(f"❌ Error during processing image from Game {game_id}. Error: {e}. Skipping....")
+    def retry_failed_images(self, session: requests.Session) -> None:
+        """ Save again the images of the games whose download failed with a retryable error, as soon as their backoff passes.
+
+        Retries are made in parallel by `concurrency` threads. Games failing again are queued again with a longer
+        backoff, until `max_retries`. Returns once no retry is left.
+        """
+        if not len(self.retry_queue):
+            return
+
+        self.logger.info(f"🔁 Retrying the images of {len(self.retry_queue)} games...")
+        pending_retries = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="image-retry") as executor:
+            while True:
+                retry = self.retry_queue.get()
+                if retry is not None:
+                    image_url, game_id, attempt = retry
+                    pending_retries.add(executor.submit(self.save_game_images, session=session, image_url=image_url, game_id=game_id, attempt=attempt))
                     continue
+                if not pending_retries:
+                    return
+                # The queue is empty, but the pending retries may fail and be queued again
+                _, pending_retries = wait(pending_retries, return_when=FIRST_COMPLETED)
+
+    def create_session(self) -> requests.Session:
+        """ Create a session to download images, with a connection pool sized for `concurrency` parallel downloads."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def save_game_images(self, session: requests.Session, image_url: str, game_id: int, attempt: int = 0) -> bool:
+        """ Download, resize and save the image of a single game in different sizes.
+
+        Images are not downloaded again if they already exist. If the image cache is set and has validators (ETag or Last-Modified)
+        for the URL, existing images are revalidated with a conditional request instead, so images changed under the same URL are updated.
+        Errors are logged and the game is skipped.
+        Each unique image is downloaded and resized once into the image store, and the images of the game are
+        linked to the stored ones as soon as they are saved (see `ImageStore`).
+        If the download fails with a retryable error, the game is queued to be retried after a backoff (see `retry_failed_images()`),
+        `attempt` being the number of retries made so far.
+        Returns True if the images of the game are saved, or will be once the resize pool (if open) saves them or the download is retried.
+        """
+        try:
+            if not self._check_valid_image_url(url=image_url):
+                self.logger.warning(f"⚠️ Game {game_id} has an invalid image URL format, can not save image. Skipping....")
+                return False
+
+            category_name = self._get_category_name_from_url(image_url=image_url)
+            game_path = self.target_dir / f"game_{game_id}"
+            # Check if images already exists to avoid re-downloading (or, with the image cache, to revalidate them)
+            if game_path.is_dir():
+                
+                # Check if images already match
+                images_exists = self._check_if_images_matches(category_name=category_name, game_id=game_id, game_path=game_path)
+                if images_exists and not self._can_revalidate(image_url=image_url):
+                    return True # Skip to game if images already exists (without validators, revalidating would download them again)
 
-            self.logger.info("✅ All game images have been processed and saved.")
+                elif not images_exists and any(game_path.iterdir()):
+                    # Images exists but do not match, so we delete the old images to re-download
+                    # (an empty directory is left by a failed download, which is retried as is)
+                    self.logger.info(f"Images for game ID {game_id} changed. Deleting old images and re-downloading.")
+                    shutil.rmtree(game_path)  # Remove existing directory with old images
+
+            game_path.mkdir(parents=True, exist_ok=True)
+            filenames_by_size = {size: self._create_filename(category_name=category_name, game_id=game_id, size=size) for size in SIZES}
+
+            stored_images, is_new_image_url = self.image_store.claim(key=image_url)
+            if is_new_image_url:
+                self._store_image(session=session, image_url=image_url, stored_images=stored_images)
+            else:
+                self.image_store.record_download_saved()
+
+            stored_images.add_done_callback(partial(
+                self._link_game_images, game_path=game_path, filenames_by_size=filenames_by_size, image_url=image_url, game_id=game_id, attempt=attempt
+            ))
+            return True
+
+        except Exception as e:
+            self.metrics.increment("images_errors_total", stage="process")
+            self.logger.error(f"❌ Error during processing image from Game {game_id}. Error: {e}. Skipping....")
+            return False
+
+    def _store_image(self, session: requests.Session, image_url: str, stored_images: Future) -> None:
+        """ Download the image of the URL and save it in all sizes in the image store.
+
+        The `stored_images` entry of the URL is resolved once the resized images are saved.
+        If the image was downloaded before and its images are still stored, it is requested with its cached validators
+        (`If-None-Match`/`If-Modified-Since`): if it was not modified, the stored images are used without downloading nor resizing it.
+        Images whose content is already stored (or being stored) from another URL are not resized again.
+        If the download fails, the entry fails with its error, so every game waiting for it can retry it.
+        """
+        cached_image = self._get_cached_image(image_url=image_url)
+        try:
+            response = self._download_image(session=session, image_url=image_url, headers=self._get_conditional_headers(cached_image=cached_image))
+        except Exception as e:
+            self.image_store.discard(key=image_url, entry=stored_images, error=e)
+            return
+
+        if response.status_code == HTTPStatus.NOT_MODIFIED and cached_image is not None:
+            self.image_store.record_not_modified()
+            self.metrics.increment("images_not_modified_total")
+            stored_images.set_result(self.image_store.get_entry_path(content_hash=cached_image["content_hash"]))
+            return
+
+        image_content = response.content
+        content_hash = self.image_store.get_content_hash(image_content=image_content)
+        self._save_cached_image(image_url=image_url, response=response, content_hash=content_hash)
+        stored_content, is_new_content = self.image_store.claim(key=content_hash)
+        stored_content.add_done_callback(partial(self._resolve_stored_images, image_url=image_url, stored_images=stored_images))
+        if not is_new_content:
+            self.image_store.record_resize_saved()
+            return
+
+        entry_path = self.image_store.get_entry_path(content_hash=content_hash)
+        if self.image_store.has_images(entry_path=entry_path, sizes=SIZES):
+            self.image_store.record_resize_saved()
+            stored_content.set_result(entry_path)
+            return
+
+        self._resize_and_save_images(image_content=image_content, content_hash=content_hash, stored_content=stored_content)
+
+    def _get_cached_image(self, image_url: str) -> dict | None:
+        """ Get the cache entry of the image URL, only if its images are still in the image store."""
+        if self.image_cache_repository is None:
+            return None
+
+        cached_image = self.image_cache_repository.get_by_url(url=image_url)
+        if cached_image is None:
+            return None
+
+        entry_path = self.image_store.get_entry_path(content_hash=cached_image["content_hash"])
+        if not self.image_store.has_images(entry_path=entry_path, sizes=SIZES):
+            return None
+        return cached_image
+
+    def _can_revalidate(self, image_url: str) -> bool:
+        """ Check if the image URL can be requested conditionally: the image cache is set and has its ETag or Last-Modified."""
+        if self.image_cache_repository is None:
+            return False
+
+        cached_image = self.image_cache_repository.get_by_url(url=image_url)
+        return cached_image is not None and bool(cached_image["etag"] or cached_image["last_modified"])
+
+    def _get_conditional_headers(self, cached_image: dict | None) -> dict[str, str]:
+        """ Get the headers to request the image only if it was modified since it was cached."""
+        headers = {}
+        if cached_image is None:
+            return headers
+
+        if cached_image["etag"]:
+            headers["If-None-Match"] = cached_image["etag"]
+        if cached_image["last_modified"]:
+            headers["If-Modified-Since"] = cached_image["last_modified"]
+        return headers
+
+    def _save_cached_image(self, image_url: str, response: requests.Response, content_hash: str) -> None:
+        """ Save the validators and content hash of the downloaded image in the image cache, if it is set."""
+        if self.image_cache_repository is None:
+            return
+
+        try:
+            self.image_cache_repository.save(
+                url=image_url,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                content_hash=content_hash,
+            )
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error caching image {image_url}: {e}. It will be downloaded again next time.")
+
+    def _resolve_stored_images(self, stored_content: Future, image_url: str, stored_images: Future) -> None:
+        """ Resolve the entry of an URL with the result of the entry of its content."""
+        error = stored_content.exception()
+        if error is not None:
+            self.image_store.discard(key=image_url, entry=stored_images, error=error)
+        else:
+            stored_images.set_result(stored_content.result())
+
+    def _link_game_images(self, stored_images: Future, game_path: Path, filenames_by_size: dict[int, str], image_url: str, game_id: int, attempt: int) -> None:
+        """ Link the stored images into the game directory, once they are saved.
+
+        If their download failed with a retryable error, the game is queued to be retried after the backoff of
+        its attempt (or the delay requested by the server), unless it is out of retries.
+        """
+        try:
+            self.image_store.link_images(entry_path=stored_images.result(), game_path=game_path, filenames_by_size=filenames_by_size)
+        except RetryableRequestError as e:
+            if attempt == self.max_retries:
+                self.metrics.increment("images_errors_total", stage="download")
+                self.logger.error(f"❌ Error downloading images from Game {game_id} after {attempt} retries. Error: {e}. Skipping....")
+                return
+
+            delay = get_retry_delay(attempt=attempt, retry_after=e.retry_after)
+            self.metrics.increment("images_download_retries_total")
+            self.logger.warning(f"⚠️ Error downloading images from Game {game_id}: {e}. Retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})...")
+            self.retry_queue.put((image_url, game_id, attempt + 1), delay=delay)
+        except Exception as e:
+            self.metrics.increment("images_errors_total", stage="download" if isinstance(e, requests.RequestException) else "link")
+            self.logger.error(f"❌ Error during saving images from Game {game_id}. Error: {e}. Skipping....")
+
+    def _download_image(self, session: requests.Session, image_url: str, headers: dict[str, str] | None = None) -> requests.Response:
+        """ Download an image once, when the rate controller allows a request to its host.
+
+        Returns the response, which has no content if the request is conditional and the image was not modified (304).
+        Raises `RetryableRequestError` on connection errors, timeouts and retryable status codes (429 and 5xx),
+        with the delay requested by the server (Retry-After), if any.
+        """
+        try:
+            with self.rate_controller.request(url=image_url) as request_slot:
+                start_time = time.perf_counter()
+                response = session.get(image_url, headers=headers, timeout=DOWNLOAD_TIMEOUT)
+                download_seconds = time.perf_counter() - start_time
+                request_slot.record(status_code=response.status_code, retry_after=response.headers.get("Retry-After"))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableRequestError(str(e)) from e
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableRequestError(f"{response.status_code} status code", retry_after=request_slot.retry_after)
+        response.raise_for_status()
+
+        self.metrics.observe("images_download_seconds", download_seconds)
+        if response.status_code != HTTPStatus.NOT_MODIFIED:
+            self._record_stage(stage_name="download", seconds=download_seconds, size=len(response.content))
+            self.metrics.increment("images_download_bytes_total", len(response.content))
+        return response
 
     def _check_valid_image_url(self, url:str) -> bool:
         """ Check if the image URL has a valid image format.
@@ -79,22 +377,77 @@ class ImageProcessor():
 
         return url.endswith(('.jpg', '.jpeg', '.png', '.svg'))
     
-    def _resize_image(self, image: pyvips.Image, new_size:int) -> pyvips.Image:
-        """ Resize the image to the new size."""
+    def _resize_and_save_images(self, image_content: bytes, content_hash: str, stored_content: Future) -> None:
+        """ Resize and save the downloaded image in all sizes in the image store, resolving `stored_content` once saved.
 
-        resized_image = image.thumbnail_image(
-            new_size,
-            height=new_size,
-            crop='centre'
+        If the resize pool is open, the image is queued to it and this method returns right away, unless
+        the resize queue is full, in which case it waits for a free slot (backpressure on the downloads).
+        Otherwise, the image is resized in the calling thread.
+        """
+        entry_path = self.image_store.get_entry_path(content_hash=content_hash)
+        entry_path.mkdir(parents=True, exist_ok=True)
+        filenames_by_size = self.image_store.get_filenames_by_size(sizes=SIZES)
+
+        if self.resize_executor is None:
+            try:
+                resize_timings = resize_and_save_images(
+                    image_content=image_content, path_to_save=str(entry_path), filenames_by_size=filenames_by_size, encoder_options=self.encoder_options
+                )
+            except Exception as e:
+                self.metrics.increment("images_errors_total", stage="resize")
+                self.image_store.discard(key=content_hash, entry=stored_content, error=e)
+                raise
+            self._record_resize(resize_timings=resize_timings, size=len(image_content))
+            stored_content.set_result(entry_path)
+            return
+
+        self.resize_slots.acquire()
+        try:
+            future = self.resize_executor.submit(resize_and_save_images, image_content, str(entry_path), filenames_by_size, self.encoder_options)
+        except Exception as e:
+            self.resize_slots.release()
+            self.image_store.discard(key=content_hash, entry=stored_content, error=e)
+            raise
+        future.add_done_callback(partial(
+            self._on_resize_done, content_hash=content_hash, stored_content=stored_content, size=len(image_content)
+        ))
+
+    def _on_resize_done(self, future: Future, content_hash: str, stored_content: Future, size: int) -> None:
+        """ Free the resize queue slot of the image, record the result of its resize and resolve its entry in the image store."""
+        self.resize_slots.release()
+        try:
+            self._record_resize(resize_timings=future.result(), size=size)
+        except Exception as e:
+            self.metrics.increment("images_errors_total", stage="resize")
+            self.image_store.discard(key=content_hash, entry=stored_content, error=e)
+            return
+
+        stored_content.set_result(self.image_store.get_entry_path(content_hash=content_hash))
+
+    def _get_store_variant_name(self) -> str:
+        """ Get the name of the image store directory for the encoder options, e.g. "Q75_interlace-False_strip-False"."""
+        return "_".join(
+            f"{option_name}{option_value}" if option_name == "Q" else f"{option_name}-{option_value}"
+            for option_name, option_value in sorted(self.encoder_options.items())
         )
-        return resized_image
 
-    def _save_image(self, image: pyvips.Image, path_to_save:Path, filename:str) -> bool:
-        """ Save the image to the specified path with the given filename."""
+    def _create_stage_stats(self) -> dict[str, dict]:
+        return {stage_name: {"images": 0, "seconds": 0.0, "bytes": 0} for stage_name in ("download", "resize")}
+
+    def _record_stage(self, stage_name: str, seconds: float, size: int) -> None:
+        """ Record an image processed by a stage, with the time spent and its size in bytes."""
+        with self.stats_lock:
+            stage_stats = self.stage_stats[stage_name]
+            stage_stats["images"] += 1
+            stage_stats["seconds"] += seconds
+            stage_stats["bytes"] += size
 
-        image_path = path_to_save / filename
-        image.write_to_file(str(image_path))
-        return True
+    def _record_resize(self, resize_timings: tuple[float, float], size: int) -> None:
+        """ Record an image resized and saved in all sizes, with the time spent decoding it and resizing and encoding it."""
+        decode_seconds, encode_seconds = resize_timings
+        self._record_stage(stage_name="resize", seconds=decode_seconds + encode_seconds, size=size)
+        self.metrics.observe("images_decode_seconds", decode_seconds)
+        self.metrics.observe("images_encode_seconds", encode_seconds)
 
     def _get_category_name_from_url(self, image_url:str) -> str:
         """ Extract the category name from the image URL.
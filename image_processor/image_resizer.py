@@ -0,0 +1,82 @@
+""" CPU-bound part of the image processing: decode, resize and encode.
+
+These functions are module-level so they can run in the worker processes of a process pool,
+decoupled from the threads that download the images.
+"""
+import time
+import pyvips
+import logging
+from pathlib import Path
+
+
+# Options of the JPEG encoder (see libvips `jpegsave`). Defaults match the libvips ones, so images are saved as before
+ENCODER_OPTIONS = {
+    "Q": 75, # Quality factor, from 1 to 100
+    "strip": False, # Remove the metadata (EXIF, ICC profile...) of the image
+    "interlace": False, # Save as progressive JPEG
+}
+
+def init_resize_worker() -> None:
+    """ Initialize a resize worker process.
+
+    Each process handles one image at a time, so libvips threading is disabled to avoid
+    oversubscribing the cores when several processes run in parallel.
+    """
+    logging.getLogger('pyvips').setLevel(logging.WARNING) # Reduce log level to WARNING to avoid too many logs from pyvips
+    pyvips.concurrency_set(1)
+
+
+def resize_and_save_images(image_content: bytes, path_to_save: str, filenames_by_size: dict[int, str], encoder_options: dict | None = None) -> tuple[float, float]:
+    """ Resize the image to each size and save it with the filename of that size.
+
+    The image is decoded once, already downscaled to the largest size (using `load_image()`), so libvips can use
+    shrink-on-load: JPEGs are decoded at a fraction of their resolution when they are much larger than the largest size,
+    and SVGs are rendered at that size. Each size is then resized from that single decoded image, held in memory.
+
+    Sizes are saved from the largest to the smallest, so the smallest image (used to check if the images
+    of a game already exist) is only written once all the others are.
+    Returns the time spent decoding the image, and resizing and encoding it in all sizes, in seconds.
+    """
+    start_time = time.perf_counter()
+
+    sizes = sorted(filenames_by_size, reverse=True)
+    loaded_image = load_image(image_content=image_content, max_size=sizes[0])
+    decoded_time = time.perf_counter()
+
+    for size in sizes:
+        resized_image = resize_image(image=loaded_image, new_size=size) # Lazy: it is computed while the image is encoded
+        save_image(image=resized_image, path_to_save=Path(path_to_save), filename=filenames_by_size[size], encoder_options=encoder_options)
+
+    return decoded_time - start_time, time.perf_counter() - decoded_time
+
+
+def load_image(image_content: bytes, max_size:int) -> pyvips.Image:
+    """ Decode the image from its content into memory, center cropped and downscaled (never upscaled) to the max size."""
+
+    loaded_image = pyvips.Image.thumbnail_buffer(
+        image_content,
+        max_size,
+        height=max_size,
+        crop='centre',
+        size='down'
+    )
+    return loaded_image.copy_memory()
+
+
+def resize_image(image: pyvips.Image, new_size:int) -> pyvips.Image:
+    """ Resize the image to the new size."""
+
+    resized_image = image.thumbnail_image(
+        new_size,
+        height=new_size,
+        crop='centre'
+    )
+    return resized_image
+
+
+def save_image(image: pyvips.Image, path_to_save:Path, filename:str, encoder_options: dict | None = None) -> bool:
+    """ Save the image to the specified path with the given filename and encoder options (`ENCODER_OPTIONS` by default)."""
+
+    image_path = path_to_save / filename
+    image.write_to_file(str(image_path), **(encoder_options or ENCODER_OPTIONS))
+    return True
@@ -0,0 +1,106 @@
+import os
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import Future
+
+
+class ImageStore:
+    """ Content-addressed store of resized images, shared by all games.
+
+    Many games use the same source image (image URLs are named after category assets), so each unique image
+    is downloaded and resized only once, into `<store>/<hash[:2]>/<hash>/`, where hash is the SHA-256 of its content.
+    The images of each game are hardlinks to the stored images (or copies, if the filesystem does not support them).
+
+    Entries are keyed by URL and by content hash. Each key maps to a Future that resolves to the directory
+    of the stored images once they are saved, so games sharing an image wait for it without downloading it again.
+    """
+
+    def __init__(self, path: Path):
+        self.store_dir = Path(path)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.entries: dict[str, Future] = {} # URL or content hash -> Future with the directory of the stored images
+        self.downloads_saved = 0
+        self.resizes_saved = 0
+        self.not_modified = 0 # Images revalidated with the server, without downloading them again
+
+    def claim(self, key: str) -> tuple[Future, bool]:
+        """ Get the entry of an URL or content hash.
+
+        Returns the Future of the entry and True if it was just created, meaning that the caller
+        is in charge of resolving it. Otherwise, the entry is being (or was already) resolved by another caller.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                return entry, False
+
+            entry = Future()
+            self.entries[key] = entry
+            return entry, True
+
+    def discard(self, key: str, entry: Future, error: Exception) -> None:
+        """ Fail the entry with the given error, and forget it so a later claim of the key retries it."""
+        with self.lock:
+            if self.entries.get(key) is entry:
+                del self.entries[key]
+        entry.set_exception(error)
+
+    def record_download_saved(self) -> None:
+        with self.lock:
+            self.downloads_saved += 1
+
+    def record_resize_saved(self) -> None:
+        with self.lock:
+            self.resizes_saved += 1
+
+    def record_not_modified(self) -> None:
+        with self.lock:
+            self.not_modified += 1
+
+    def get_stats(self) -> dict[str, int]:
+        """ Get the number of downloads and resizes saved by reusing stored images."""
+        with self.lock:
+            return {
+                "downloads_saved": self.downloads_saved,
+                "resizes_saved": self.resizes_saved,
+                "not_modified": self.not_modified,
+            }
+
+    def get_content_hash(self, image_content: bytes) -> str:
+        return hashlib.sha256(image_content).hexdigest()
+
+    def get_entry_path(self, content_hash: str) -> Path:
+        return self.store_dir / content_hash[:2] / content_hash
+
+    def get_filenames_by_size(self, sizes: list[int]) -> dict[int, str]:
+        """ Get the filenames of the stored images of each size."""
+        return {size: f"{size}x{size}.jpg" for size in sizes}
+
+    def has_images(self, entry_path: Path, sizes: list[int]) -> bool:
+        """ Check if the images of an entry are already stored.
+
+        Images are saved from the largest to the smallest size, so the smallest one is only written once all the others are.
+        """
+        filename = self.get_filenames_by_size(sizes=sizes)[min(sizes)]
+        return (entry_path / filename).is_file()
+
+    def link_images(self, entry_path: Path, game_path: Path, filenames_by_size: dict[int, str]) -> None:
+        """ Link the stored images of each size into the game directory, with the filenames of the game.
+
+        Images are linked from the largest to the smallest size, so the smallest one keeps signaling that all are saved.
+        Images already linked to the stored ones are left as they are.
+        """
+        stored_filenames_by_size = self.get_filenames_by_size(sizes=list(filenames_by_size))
+        for size in sorted(filenames_by_size, reverse=True):
+            stored_image_path = entry_path / stored_filenames_by_size[size]
+            game_image_path = game_path / filenames_by_size[size]
+            if game_image_path.is_file() and os.path.samefile(stored_image_path, game_image_path):
+                continue
+            game_image_path.unlink(missing_ok=True)
+            try:
+                os.link(stored_image_path, game_image_path)
+            except OSError:
+                shutil.copyfile(stored_image_path, game_image_path) # Hardlinks are not supported (e.g. another filesystem)
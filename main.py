@@ -1,14 +1,34 @@
+import os
+import sys
 import logging
-import time
+import argparse
+from sqlite3 import Connection
+from contextlib import contextmanager
 
-from models.game import Game
-from csv_writer.csv_writer import CSVWriter
-from scraper.scraper import WebScraper
 from logger.setup_logger import setup_logger
 from database.database_controller import DatabaseController
-from image_processor.image_procesor import ImageProcessor
 from repositories.game_repository import GameRepository
+from metrics.registry import metrics_registry
+from profiling.profiler import profile_stage
 
+# The subsystems of each step (Playwright and BeautifulSoup for scraping, pyvips and requests for images) are imported
+# by the steps that use them, so a run only loads what it needs (e.g. an export loads none of them)
+
+SCRAPER_CONCURRENCY = 4 # Number of workers fetching listing pages in parallel (1 = sequential)
+SCRAPER_FETCH_MODE = "http" # "http" fetches listing pages without a browser, falling back to it when needed. "browser" always uses it
+SCRAPER_LEAN_BROWSER = True # The browser skips the images, media, fonts and analytics of the listing pages (only their DOM is parsed)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0")) # Port of the local Prometheus endpoint (/metrics). 0 does not expose it
+PROFILE_STAGES = os.environ.get("PROFILE_STAGES", "0") == "1" # Profile each run with cProfile and tracemalloc into data/profiles
+
+# Exit codes of the command line runs (argparse exits with 2 on invalid arguments)
+EXIT_OK = 0
+EXIT_ERROR = 1 # A step failed
+EXIT_NO_DATA = 3 # Nothing to process: the database has no games yet (run the scraper first)
+EXIT_INTERRUPTED = 130
+
+MENU_COMMANDS = {"1": "scrape", "2": "images", "3": "export", "4": "all"}
+
+logger = logging.getLogger(__name__)
 
 def show_menu():
     print("-"*40)
@@ -19,99 +39,200 @@ def show_menu():
     print("5. Exit")
     print("-"*40)
 
-if __name__ == "__main__":
-        
-    try: 
-        # Setup logger
-        conn = None
-        setup_logger()
-        logger = logging.getLogger(__name__)
-
+def create_parser() -> argparse.ArgumentParser:
+    """ Create the parser of the command line. Without a command, the interactive menu is shown."""
+    parser = argparse.ArgumentParser(description="Scrape the games of the website, save their images and write them as CSV.")
+    parser.add_argument("--profile", action="store_true", default=PROFILE_STAGES, help="Profile the run with cProfile and tracemalloc into data/profiles")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Expose the metrics in Prometheus format at this port (0 does not expose them)")
+
+    scrape_options = argparse.ArgumentParser(add_help=False)
+    scrape_options.add_argument("--concurrency", type=int, default=SCRAPER_CONCURRENCY, help="Listing pages fetched in parallel (1 = sequential)")
+    scrape_options.add_argument("--fetch-mode", choices=("http", "browser"), default=SCRAPER_FETCH_MODE, help="How listing pages are fetched")
+    scrape_options.add_argument("--lean-browser", action=argparse.BooleanOptionalAction, default=SCRAPER_LEAN_BROWSER,
+                                help="Block images, media, fonts and analytics in the browser, and stop waiting once the DOM is loaded")
+
+    images_options = argparse.ArgumentParser(add_help=False)
+    images_options.add_argument("--image-workers", type=int, help="Images downloaded in parallel")
+    images_options.add_argument("--resize-workers", type=int, help="Processes resizing images (default: one per core, 0 resizes in the download threads)")
+    images_options.add_argument("--resize-queue-size", type=int, help="Max downloaded images waiting to be resized")
+
+    subparsers = parser.add_subparsers(dest="command", title="commands")
+    subparsers.add_parser("scrape", parents=[scrape_options], help="Scrape the games of the website into the database")
+    subparsers.add_parser("images", parents=[images_options], help="Download and save the images of the games")
+    export_parser = subparsers.add_parser("export", help="Write the games of all categories as CSV to the standard output, or to files")
+    export_parser.add_argument("--format", choices=("stdout", "csv", "ndjson", "parquet", "arrow"), default="stdout",
+                               help="stdout writes CSV to the terminal. The others write files (parquet and arrow require pyarrow)")
+    export_parser.add_argument("--layout", choices=("combined", "per-category"), default="combined", help="A single file, or a file per category")
+    export_parser.add_argument("--output-dir", help="Directory of the exported files (default: data/exports)")
+    export_parser.add_argument("--workers", type=int, help="Categories exported in parallel, with the per-category layout")
+    all_parser = subparsers.add_parser("all", parents=[scrape_options, images_options], help="Run all steps as a pipeline")
+    all_parser.add_argument("--images-queue-size", type=int, help="Max scraped images waiting to be saved")
+    return parser
+
+@contextmanager
+def open_image_cache_repository():
+    """ Open the image cache database, shared by the image download threads, and close it on exit."""
+    from repositories.image_cache_repository import ImageCacheRepository
+
+    image_cache_database_controller = DatabaseController(db_name='image_cache.db', check_same_thread=False)
+    image_cache_conn = image_cache_database_controller.connect()
+    try:
+        image_cache_repository = ImageCacheRepository(connection=image_cache_conn)
+        image_cache_repository.create_table()
+        yield image_cache_repository
+    finally:
+        image_cache_database_controller.disconnect()
+
+def create_scraper(args: argparse.Namespace, conn: Connection, game_repository: GameRepository, rate_controller=None):
+    from scraper.scraper import WebScraper
+    from repositories.crawl_run_repository import CrawlRunRepository
+
+    return WebScraper(
+        game_repository=game_repository,
+        concurrency=args.concurrency,
+        fetch_mode=args.fetch_mode,
+        lean_browser=args.lean_browser,
+        crawl_run_repository=CrawlRunRepository(connection=conn),
+        rate_controller=rate_controller,
+    )
+
+def create_image_processor(args: argparse.Namespace, image_cache_repository, rate_controller=None):
+    from image_processor.image_procesor import ImageProcessor
+
+    # Options not given keep the defaults of the image processor
+    options = {"concurrency": args.image_workers, "resize_workers": args.resize_workers, "resize_queue_size": args.resize_queue_size}
+    return ImageProcessor(
+        image_cache_repository=image_cache_repository,
+        rate_controller=rate_controller,
+        **{name: value for name, value in options.items() if value is not None},
+    )
+
+def scrape(args: argparse.Namespace, conn: Connection, game_repository: GameRepository) -> int:
+    logger.info("Starting scraper...")
+    create_scraper(args=args, conn=conn, game_repository=game_repository).scrape_web()
+    return EXIT_OK
+
+def save_images(args: argparse.Namespace, conn: Connection, game_repository: GameRepository) -> int:
+    logger.info("Starting the image saving process...")
+    games_images_urls_and_id = game_repository.get_images_url_and_product_id()
+    if not games_images_urls_and_id:
+        logger.warning("No images found to download. Please, first run the scraper to populate the database.")
+        return EXIT_NO_DATA
+
+    with open_image_cache_repository() as image_cache_repository:
+        image_processor = create_image_processor(args=args, image_cache_repository=image_cache_repository)
+        image_processor.save_all_games_images(images_data=games_images_urls_and_id)
+    return EXIT_OK
+
+def export(args: argparse.Namespace, conn: Connection, game_repository: GameRepository) -> int:
+    logger.info("Starting the CSV writing process..." if args.format == "stdout" else f"Starting the {args.format} export process...")
+    all_categories_names = game_repository.get_categories_names()
+    if not all_categories_names:
+        logger.warning("No categories found. Please, first run the scraper to populate the database.")
+        return EXIT_NO_DATA
+
+    if args.format == "stdout":
+        from csv_writer.csv_writer import CSVWriter
+        CSVWriter().write_all_games(rows_by_category=game_repository.iter_games_rows_by_category())
+    else:
+        from exporters.game_exporter import GameExporter
+        # Options not given keep the defaults of the exporter
+        options = {"path": args.output_dir, "workers": args.workers}
+        game_exporter = GameExporter(
+            connection_factory=lambda: DatabaseController(check_same_thread=False).connect(), # Each export thread reads with its own connection
+            file_format=args.format,
+            layout=args.layout,
+            **{name: value for name, value in options.items() if value is not None},
+        )
+        game_exporter.export()
+    logger.info("✅ All steps completed successfully!")
+    return EXIT_OK
+
+def run_all(args: argparse.Namespace, conn: Connection, game_repository: GameRepository) -> int:
+    from csv_writer.csv_writer import CSVWriter
+    from pipeline.run_all_pipeline import RunAllPipeline
+    from rate_control.rate_controller import RateController
+
+    logger.info("Starting the full process: Scraper, Image Saving, and CSV Writing...")
+    with open_image_cache_repository() as image_cache_repository:
+        # Scraping, image saving and CSV writing run as a pipeline: images are saved as soon as
+        # their games are scraped, and the CSV is written while the last images are being saved
+        pipeline_options = {"images_queue_size": args.images_queue_size} if args.images_queue_size is not None else {}
+        # Pages and images are requested to the same host, so they share its rate and concurrency limits
+        rate_controller = RateController()
+        run_all_pipeline = RunAllPipeline(
+            scraper=create_scraper(args=args, conn=conn, game_repository=game_repository, rate_controller=rate_controller),
+            image_processor=create_image_processor(args=args, image_cache_repository=image_cache_repository, rate_controller=rate_controller),
+            game_repository=game_repository,
+            csv_writer=CSVWriter(),
+            **pipeline_options,
+        )
+        run_all_pipeline.run()
+    logger.info("✅ All steps completed successfully!")
+    return EXIT_OK
+
+COMMANDS = {"scrape": scrape, "images": save_images, "export": export, "all": run_all}
+
+def run_command(args: argparse.Namespace, conn: Connection, game_repository: GameRepository) -> int:
+    """ Run the step of the command. Each run writes a report of its metrics to data/reports (and its profile to data/profiles, if enabled)."""
+    with metrics_registry.run_report(run_name=args.command), profile_stage(stage_name=args.command, enabled=args.profile):
+        return COMMANDS[args.command](args=args, conn=conn, game_repository=game_repository)
+
+def run_menu(parser: argparse.ArgumentParser, args: argparse.Namespace, conn: Connection, game_repository: GameRepository) -> int:
+    """ Show the interactive menu until the user exits. Each option runs its command with the default options."""
+    while True:
+        show_menu()
+        choice = input("\nOption: ").strip()
+
+        if choice in MENU_COMMANDS:
+            command_args = parser.parse_args([MENU_COMMANDS[choice]], namespace=argparse.Namespace(**vars(args)))
+            run_command(args=command_args, conn=conn, game_repository=game_repository)
+
+        elif choice == "5":
+            print("Exiting the program")
+            return EXIT_OK
+        else:
+            print("Invalid option. Please, try again.")
+
+def main(argv: list[str] | None = None) -> int:
+    """ Run a single command (e.g. `python main.py export`) and return its exit code, or the interactive menu if no command is given."""
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    setup_logger()
+
+    conn = None
+    metrics_server = None
+    try:
         logger.info("🚀 Starting the Games Scraper...")
 
+        if args.metrics_port:
+            from metrics.server import MetricsServer
+            metrics_server = MetricsServer(registry=metrics_registry, port=args.metrics_port)
+            metrics_server.start()
 
         # Initialze database connection
         database_controller = DatabaseController()
         conn = database_controller.connect()
         database_controller.database_initialization()
-
-        # Initialize components
-        csv_writer = CSVWriter()
-        image_processor = ImageProcessor()
         game_repository = GameRepository(connection=conn)
-        scraper = WebScraper(game_repository=game_repository)
-
-        while True:
-            show_menu()
-            choice = input("\nOption: ").strip()
-
-            if choice == '1':
-                # Start web scraping
-                logger.info("Starting scraper...")
-                scraper.scrape_web()
-
-            elif choice == '2':
-                # Save images
-                logger.info("Starting the image saving process...")
-                games_images_urls_and_id = game_repository.get_images_url_and_product_id()
-
-                if not games_images_urls_and_id:
-                    logger.warning("No images found to download. Please, first run the scraper to populate the database.")
-
-                else:
-                    image_processor.save_all_games_images(images_data=games_images_urls_and_id)
-
-            # Write in CSV format
-            elif choice == '3':
-                logger.info("Starting the CSV writing process...")
-                all_categories_names = game_repository.get_categories_names()
-                if not all_categories_names:
-                    logger.warning("No categories found. Please, first run the scraper to populate the database.")
-
-                else:
-                    csv_writer.write_headers(Game.get_fields_name()) # Write headers
-
-                    for category_name in all_categories_names:
-                        games = game_repository.get_games_by_category_name(category_name=category_name)
-                        csv_writer.write_games_by_category(category_name=category_name, games_entities=games)
-                        time.sleep(0.1)  # Sleep for 0.1 second between categories
-
-                    csv_writer.flush()  # Ensure all data is written to output
-                    logger.info("✅ All steps completed successfully!")
-
-            elif choice == "4":
-                logger.info("Starting the full process: Scraper, Image Saving, and CSV Writing...")
-                
-                # Step 1: Scrape the web
-                scraper.scrape_web()
-
-                # Step 2: Save images
-                games_images_urls_and_id = game_repository.get_images_url_and_product_id()
-                image_processor.save_all_games_images(images_data=games_images_urls_and_id)
-
-                # Step 3: Write CSV
-                all_categories_names = game_repository.get_categories_names()
-                csv_writer.write_headers(Game.get_fields_name())
-                for category_name in all_categories_names:
-                    games = game_repository.get_games_by_category_name(category_name=category_name)
-                    csv_writer.write_games_by_category(category_name=category_name, games_entities=games)
-                    time.sleep(0.1)
-
-                csv_writer.flush()
-                logger.info("✅ All steps completed successfully!")
-
-            elif choice == "5":
-                print("Exiting the program")
-                break
-            else:
-                print("Invalid option. Please, try again.")
-                
 
+        if args.command is None:
+            return run_menu(parser=parser, args=args, conn=conn, game_repository=game_repository)
+        return run_command(args=args, conn=conn, game_repository=game_repository)
+
+    except KeyboardInterrupt:
+        logger.warning("⚠️ Interrupted by the user.")
+        return EXIT_INTERRUPTED
 
     except Exception as e:
-        logger.error(f"❌ An error occurred during scraping: {e}")
-        raise
+        logger.exception(f"❌ An error occurred during scraping: {e}")
+        return EXIT_ERROR
 
     finally:
+        if metrics_server:
+            metrics_server.stop()
         if conn:
             database_controller.disconnect()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+
+# Upper bounds (in seconds) of the histogram buckets. Observations above the last one only count in "+Inf"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """ Distribution of observed values (e.g. durations), in cumulative buckets as Prometheus histograms."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for index, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[index] += 1
+
+    def get_quantile(self, quantile: float) -> float | None:
+        """ Estimate a quantile as the upper bound of the bucket where it falls (the max, if it is above all buckets)."""
+        if not self.count:
+            return None
+        for upper_bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            if bucket_count >= quantile * self.count:
+                return min(upper_bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.get_quantile(0.5),
+            "p95": self.get_quantile(0.95),
+            "buckets": {str(upper_bound): bucket_count for upper_bound, bucket_count in zip(self.buckets, self.bucket_counts)},
+        }
+
+
+class MetricsRegistry:
+    """ Thread-safe registry of the metrics of a run: counters and histograms (timers record into histograms).
+
+    Metrics are identified by name and optional labels, e.g. `increment("scraper_pages_total", fetch="http")`.
+    They can be written as a JSON run report (`write_report()`) or in Prometheus text format (`to_prometheus()`).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[tuple[str, tuple], float] = {}
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+        self.started_at = datetime.now()
+        self.logger = logging.getLogger(__name__)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """ Add the value to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """ Record a value (e.g. a duration in seconds) in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """ Record the duration of the block, in seconds, in a histogram. Failed blocks are recorded too."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+
+    def reset(self) -> None:
+        """ Remove all metrics, to start a new run."""
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = datetime.now()
+
+    @contextmanager
+    def run_report(self, run_name: str, path: str = 'data/reports'):
+        """ Reset the metrics, run the block and write the report of its run, even if it fails."""
+        self.reset()
+        try:
+            yield
+        finally:
+            self.write_report(run_name=run_name, path=path)
+
+    def get_snapshot(self) -> dict:
+        """ Get the current value of all metrics."""
+        with self.lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                    for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0])
+                ],
+            }
+
+    def write_report(self, run_name: str, path: str = 'data/reports') -> Path:
+        """ Write the metrics of the run as a JSON report in the given directory, and return its path."""
+        report_dir = Path(path)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        finished_at = datetime.now()
+        report = {
+            "run": run_name,
+            **self.get_snapshot(),
+            "finished_at": finished_at.isoformat(timespec="seconds"),
+            "duration_seconds": (finished_at - self.started_at).total_seconds(),
+        }
+
+        report_path = report_dir / f"{run_name}_{self.started_at:%Y%m%d_%H%M%S}.json"
+        report_path.write_text(json.dumps(report, indent=2))
+        self.logger.info(f"📊 Run report written to {report_path}")
+        return report_path
+
+    def to_prometheus(self) -> str:
+        """ Get all metrics in the Prometheus text exposition format."""
+        snapshot = self.get_snapshot()
+        lines = []
+        declared_metrics = set()
+
+        for counter in snapshot["counters"]:
+            if counter["name"] not in declared_metrics:
+                declared_metrics.add(counter["name"])
+                lines.append(f"# TYPE {counter['name']} counter")
+            lines.append(f"{counter['name']}{self._format_labels(counter['labels'])} {counter['value']}")
+
+        for histogram in snapshot["histograms"]:
+            name, labels = histogram["name"], histogram["labels"]
+            if name not in declared_metrics:
+                declared_metrics.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for upper_bound, bucket_count in histogram["buckets"].items():
+                lines.append(f"{name}_bucket{self._format_labels({**labels, 'le': upper_bound})} {bucket_count}")
+            lines.append(f"{name}_bucket{self._format_labels({**labels, 'le': '+Inf'})} {histogram['count']}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def _format_labels(self, labels: dict) -> str:
+        if not labels:
+            return ""
+        formatted_labels = ",".join(f'{label_name}="{self._escape_label_value(label_value)}"' for label_name, label_value in labels.items())
+        return "{" + formatted_labels + "}"
+
+    def _escape_label_value(self, label_value) -> str:
+        return str(label_value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Registry shared by all the components of the application, unless another one is given to them
+metrics_registry = MetricsRegistry()
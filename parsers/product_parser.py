@@ -0,0 +1,177 @@
+import logging
+from dataclasses import dataclass, field
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import Tag
+
+
+PRODUCT_CARD_CLASS = "product-card"
+PAGINATION_CLASS = "pagination"
+
+@dataclass
+class ProductCardData:
+    """ Raw fields of a product card of a listing page, before being converted to a Game entity.
+
+    Fields that are not found in the card are None.
+    """
+    href: str|None = None
+    title: str|None = None
+    description: str|None = None
+    price: str|None = None
+    is_out_of_stock: bool = False
+    categories: list[str] = field(default_factory=list)
+    srcset: str|None = None
+
+@dataclass
+class ListingPageData:
+    """ Raw data of a listing page: its product cards and its pagination status."""
+    cards: list[ProductCardData]
+    has_pagination: bool
+    is_last_page: bool
+
+
+def _clean_category_name(text: str) -> str:
+    return text.strip().replace('"', '')
+
+
+class BeautifulSoupProductParser:
+    """ Reference parser backend, based on BeautifulSoup and the pure-Python "html.parser".
+
+    Only the product cards and pagination subtrees of the page are built (using a SoupStrainer).
+    """
+
+    def __init__(self):
+        self.strainer = SoupStrainer(["div", "ul"], class_=self._is_listing_subtree_class)
+
+    def parse(self, html: str) -> ListingPageData:
+        soup = BeautifulSoup(html, "html.parser", parse_only=self.strainer)
+        cards = [self._parse_card(card=card) for card in soup.find_all("div", class_=PRODUCT_CARD_CLASS)]
+
+        pagination_object = soup.find("ul", class_=PAGINATION_CLASS)
+        if pagination_object is None:
+            return ListingPageData(cards=cards, has_pagination=False, is_last_page=True)
+
+        next_button_object = pagination_object.find("li", class_="next disabled")
+        return ListingPageData(cards=cards, has_pagination=True, is_last_page=bool(next_button_object))
+
+    def _is_listing_subtree_class(self, class_value: str|None) -> bool:
+        if not class_value:
+            return False
+        return bool({PRODUCT_CARD_CLASS, PAGINATION_CLASS} & set(class_value.split()))
+
+    def _parse_card(self, card: Tag) -> ProductCardData:
+        card_data = ProductCardData()
+
+        header_object = card.find("a", class_="card-header")
+        if header_object:
+            card_data.href = header_object.get("href")
+
+        title_object = card.find("h4", class_="title")
+        if title_object:
+            card_data.title = title_object.text
+
+        description_object = card.find("p", class_="description")
+        if description_object:
+            card_data.description = description_object.text
+
+        price_object = card.find("div", class_="price-wrapper")
+        if price_object:
+            card_data.price = price_object.text
+
+        card_data.is_out_of_stock = card.find("p", class_="out-of-stock") is not None
+
+        categories_object = card.find("p", class_="category")
+        if categories_object:
+            card_data.categories = [_clean_category_name(category.text) for category in categories_object.find_all("span") if category.text.strip()]
+
+        image_object = card.find("img", class_="image")
+        if image_object:
+            card_data.srcset = image_object.get("srcset")
+
+        return card_data
+
+
+class LxmlProductParser:
+    """ Fast parser backend, based on lxml (libxml2).
+
+    Each product card is read in a single pass over its elements, keeping the first match of each
+    field as BeautifulSoup's `find()` does.
+    """
+
+    def __init__(self):
+        from lxml import html as lxml_html # Optional dependency, only imported if this backend is used
+        self.lxml_html = lxml_html
+
+    def parse(self, html: str) -> ListingPageData:
+        document = self.lxml_html.fromstring(html)
+        cards = [self._parse_card(card=card) for card in document.iter("div") if PRODUCT_CARD_CLASS in self._get_classes(card)]
+
+        pagination_object = next((ul for ul in document.iter("ul") if PAGINATION_CLASS in self._get_classes(ul)), None)
+        if pagination_object is None:
+            return ListingPageData(cards=cards, has_pagination=False, is_last_page=True)
+
+        is_last_page = any(li.get("class", "").split() == ["next", "disabled"] for li in pagination_object.iter("li"))
+        return ListingPageData(cards=cards, has_pagination=True, is_last_page=is_last_page)
+
+    def _get_classes(self, element) -> list[str]:
+        return element.get("class", "").split()
+
+    def _parse_card(self, card) -> ProductCardData:
+        card_data = ProductCardData()
+        found_fields = set()
+        categories_object = None
+
+        for element in card.iterdescendants():
+            if not isinstance(element.tag, str):
+                continue # Skip comments and processing instructions
+
+            tag, classes = element.tag, self._get_classes(element)
+            if tag == "a" and "card-header" in classes and "href" not in found_fields:
+                found_fields.add("href")
+                card_data.href = element.get("href")
+            elif tag == "h4" and "title" in classes and "title" not in found_fields:
+                found_fields.add("title")
+                card_data.title = element.text_content()
+            elif tag == "p" and "description" in classes and "description" not in found_fields:
+                found_fields.add("description")
+                card_data.description = element.text_content()
+            elif tag == "div" and "price-wrapper" in classes and "price" not in found_fields:
+                found_fields.add("price")
+                card_data.price = element.text_content()
+            elif tag == "p" and "out-of-stock" in classes:
+                card_data.is_out_of_stock = True
+            elif tag == "p" and "category" in classes and categories_object is None:
+                categories_object = element
+            elif tag == "span" and categories_object is not None and categories_object in element.iterancestors("p"):
+                category_text = element.text_content()
+                if category_text.strip():
+                    card_data.categories.append(_clean_category_name(category_text))
+            elif tag == "img" and "image" in classes and "srcset" not in found_fields:
+                found_fields.add("srcset")
+                card_data.srcset = element.get("srcset")
+
+        return card_data
+
+
+PARSER_BACKENDS = {
+    "bs4": BeautifulSoupProductParser,
+    "lxml": LxmlProductParser,
+}
+
+def get_product_parser(backend: str|None = None) -> BeautifulSoupProductParser|LxmlProductParser:
+    """ Get a parser for the given backend.
+
+    If no backend is given, lxml is used when it is installed, and BeautifulSoup otherwise.
+    Both backends build the same games from well-formed listing pages (see `tests/test_product_parser.py`). On invalid markup
+    they may differ, as each one repairs it its own way: e.g. libxml2 closes a `<p>` before a `<div>` inside it, so the text
+    of the div is left out of the paragraph, while html.parser keeps it.
+    """
+    if backend is None:
+        try:
+            return LxmlProductParser()
+        except ImportError:
+            logging.getLogger(__name__).warning("⚠️ lxml is not installed. Using the BeautifulSoup parser backend.")
+            return BeautifulSoupProductParser()
+
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Invalid parser backend '{backend}'. Valid backends are: {', '.join(PARSER_BACKENDS)}")
+    return PARSER_BACKENDS[backend]()
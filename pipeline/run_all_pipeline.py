@@ -0,0 +1,122 @@
+import time
+import queue
+import logging
+import threading
+
+from models.game import Game
+from scraper.scraper import WebScraper
+from csv_writer.csv_writer import CSVWriter
+from image_processor.image_procesor import ImageProcessor
+from repositories.game_repository import GameRepository
+
+
+IMAGES_QUEUE_SIZE = 200 # Max images waiting to be saved. When full, the scraper waits for the image workers
+
+_END_OF_QUEUE = None # Sentinel that tells an image worker there is no more work
+
+class RunAllPipeline:
+    """ Run all steps (scraping, image saving and CSV writing) overlapping them, instead of one after another.
+
+    - The scraper runs in the calling thread. The games of each page are queued as soon as they are saved.
+    - A pool of image workers takes the queued games and saves their images while later pages are being scraped.
+    - Once scraping finishes, the CSV is written while the image workers save the last queued images.
+    - Once the image workers finish, the images whose download failed with a retryable error are retried.
+
+    The queue is bounded, so the scraper waits when the image workers fall behind (backpressure).
+    If a step fails, the image workers drop the pending images and stop, and the error is raised.
+    """
+
+    def __init__(
+        self,
+        scraper: WebScraper,
+        image_processor: ImageProcessor,
+        game_repository: GameRepository,
+        csv_writer: CSVWriter,
+        image_workers: int | None = None,
+        images_queue_size: int = IMAGES_QUEUE_SIZE,
+    ):
+        self.scraper = scraper
+        self.image_processor = image_processor
+        self.game_repository = game_repository
+        self.csv_writer = csv_writer
+        self.image_workers = image_workers or image_processor.concurrency # Threads saving images while the scraper runs
+        self.images_queue: queue.Queue[tuple[str, int] | None] = queue.Queue(maxsize=images_queue_size)
+        self.stop_event = threading.Event()
+        self.images_lock = threading.Lock()
+        self.queued_images = 0
+        self.saved_images = 0
+        self.session = None
+        self.logger = logging.getLogger(__name__)
+
+    def run(self) -> None:
+        """ Run all the steps of the pipeline and wait until all of them finish."""
+        self.logger.info(f"🚀 Starting the pipeline with {self.image_workers} image workers...")
+        workers = [
+            threading.Thread(target=self._image_worker, name=f"image-worker-{index}", daemon=True)
+            for index in range(self.image_workers)
+        ]
+        self.session = self.image_processor.create_session() # Shared by all image workers
+        with self.image_processor.resize_pool():
+            self._run_steps(workers=workers)
+
+    def _run_steps(self, workers: list[threading.Thread]) -> None:
+        """ Start the image workers, run the scraping and CSV writing steps, and wait until the workers finish."""
+        for worker in workers:
+            worker.start()
+
+        start_time = time.perf_counter()
+        try:
+            # Step 1: Scrape the web, queuing the images of each page as soon as its games are saved
+            self.scraper.scrape_web(on_games_saved=self._queue_games_images)
+
+            # Step 2: Write CSV, while the image workers save the remaining images
+            self.csv_writer.write_all_games(rows_by_category=self.game_repository.iter_games_rows_by_category())
+
+        except BaseException:
+            self.logger.error("❌ Pipeline step failed. Stopping the image workers...")
+            self.stop_event.set()
+            raise
+
+        finally:
+            # Step 3: Wait until the image workers save all queued images (or drop them, if a step failed)
+            for _ in workers:
+                self.images_queue.put(_END_OF_QUEUE)
+            for worker in workers:
+                worker.join()
+            try:
+                if not self.stop_event.is_set():
+                    # Images whose download failed with a retryable error, once their backoff passes
+                    self.image_processor.retry_failed_images(session=self.session)
+            finally:
+                self.session.close()
+
+        self.image_processor.log_stages_throughput(elapsed_seconds=time.perf_counter() - start_time)
+        self.logger.info(f"✅ Pipeline completed. Images saved: {self.saved_images}/{self.queued_images}")
+
+    def _queue_games_images(self, games: list[Game]) -> None:
+        """ Queue the images of the given games. Blocks while the queue is full."""
+        for game in games:
+            self.images_queue.put((game.image_url, game.id))
+            self.queued_images += 1
+
+    def _image_worker(self) -> None:
+        """ Save the images of the queued games until the end of the queue is reached."""
+        while True:
+            image_data = self.images_queue.get()
+            if image_data is _END_OF_QUEUE:
+                return
+            if self.stop_event.is_set():
+                continue # Drop pending images, but keep draining the queue so the producer is never blocked
+
+            image_url, game_id = image_data
+            try:
+                images_saved = self.image_processor.save_game_images(session=self.session, image_url=image_url, game_id=game_id)
+            except Exception as e:
+                self.logger.error(f"❌ Unexpected error saving images of Game {game_id}: {e}. Skipping....")
+                images_saved = False
+
+            if images_saved:
+                with self.images_lock:
+                    self.saved_images += 1
+                    if self.saved_images % 100 == 0:
+                        self.logger.info(f"📥 Images saved so far: {self.saved_images}/{self.queued_images}")
@@ -0,0 +1,119 @@
+import io
+import sys
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+
+
+PROFILES_PATH = 'data/profiles'
+TOP_FUNCTIONS = 25 # Functions with the highest own time (excluding their callees) shown in the log summary
+TOP_ALLOCATIONS = 10 # Lines allocating the most memory shown in the log summary
+TRACEMALLOC_FRAMES = 5 # Frames kept per allocation traceback. More frames are more precise, but slower
+# Since Python 3.12, a cProfile profiler sees all threads, and a second active profiler raises a ValueError.
+# Before, it only sees the thread that enabled it, so each thread started by the stage gets its own profiler
+PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+logger = logging.getLogger(__name__)
+
+def profile_stage(stage_name: str, enabled: bool, path: str = PROFILES_PATH, top: int = TOP_FUNCTIONS):
+    """ Profile the CPU time and memory allocations of a stage (e.g. a menu option), if enabled.
+
+    Returns a context manager. When profiling is disabled, it is a `nullcontext()`, so it adds no overhead.
+    Otherwise, the block runs under cProfile and tracemalloc, and on exit it writes to `path`:
+        - `{stage}_{timestamp}.prof`: cProfile stats of the calling thread and the threads started by the stage
+          (e.g. download workers), readable with `python -m pstats` or snakeviz.
+        - `{stage}_{timestamp}.tracemalloc`: tracemalloc snapshot at the end of the stage, readable with `tracemalloc.Snapshot.load()`.
+    A summary with the `top` functions by own time (where the time actually goes: parsing, SQLite, sockets, waits...)
+    and the lines that allocated the most memory during the stage is logged.
+
+    Work done in other processes (e.g. the resize workers) is not profiled: it shows as the time spent waiting for it.
+    """
+    if not enabled:
+        return nullcontext()
+    return _profile_stage(stage_name=stage_name, path=Path(path), top=top)
+
+
+@contextmanager
+def _profile_stage(stage_name: str, path: Path, top: int):
+    threads_profilers: list[cProfile.Profile] = []
+    threads_profilers_lock = threading.Lock()
+
+    def start_thread_profiler(*args) -> None:
+        """ Profile a thread started by the stage. Called on its first event, it replaces itself with the thread profiler."""
+        thread_profiler = cProfile.Profile()
+        with threads_profilers_lock:
+            threads_profilers.append(thread_profiler)
+        thread_profiler.enable()
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    start_snapshot = tracemalloc.take_snapshot()
+
+    logger.info(f"🔬 Profiling stage '{stage_name}'...")
+    profiler = cProfile.Profile()
+    if PER_THREAD_PROFILERS:
+        threading.setprofile(start_thread_profiler)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if PER_THREAD_PROFILERS:
+            threading.setprofile(None)
+        end_snapshot = tracemalloc.take_snapshot()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        # Threads of the stage are finished by now (their pools are shut down on exit), so their stats are complete
+        stats = pstats.Stats(profiler)
+        with threads_profilers_lock:
+            for thread_profiler in threads_profilers:
+                stats.add(thread_profiler)
+
+        _write_profile(
+            stage_name=stage_name, path=path, top=top, stats=stats,
+            start_snapshot=start_snapshot, end_snapshot=end_snapshot, peak_memory=peak_memory,
+            threads=len(threads_profilers) if PER_THREAD_PROFILERS else None,
+        )
+
+
+def _write_profile(
+    stage_name: str,
+    path: Path,
+    top: int,
+    stats: pstats.Stats,
+    start_snapshot: tracemalloc.Snapshot,
+    end_snapshot: tracemalloc.Snapshot,
+    peak_memory: int,
+    threads: int | None,
+) -> None:
+    """ Write the CPU stats and the memory snapshot of a stage, and log their summary. `threads` is None if all threads share the profiler."""
+    path.mkdir(parents=True, exist_ok=True)
+    profile_name = f"{stage_name}_{datetime.now():%Y%m%d_%H%M%S}"
+    stats_path = path / f"{profile_name}.prof"
+    snapshot_path = path / f"{profile_name}.tracemalloc"
+    stats.dump_stats(stats_path)
+    end_snapshot.dump(str(snapshot_path))
+
+    summary = io.StringIO()
+    stats.stream = summary
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+
+    allocations = end_snapshot.compare_to(start_snapshot, "lineno")[:TOP_ALLOCATIONS]
+    allocations_summary = "\n".join(f"    {allocation}" for allocation in allocations)
+
+    threads_profiled = "all threads profiled" if threads is None else f"{threads} worker threads profiled"
+    logger.info(
+        f"🔬 Profile of stage '{stage_name}' ({threads_profiled}) written to {stats_path} and {snapshot_path}\n"
+        f"{summary.getvalue().strip()}\n"
+        f"  Peak traced memory: {peak_memory / 1_000_000:.1f} MB. Top {len(allocations)} lines by memory allocated during the stage:\n"
+        f"{allocations_summary}"
+    )
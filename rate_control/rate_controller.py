@@ -0,0 +1,280 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+from metrics.registry import MetricsRegistry, metrics_registry
+
+
+REQUESTS_PER_SECOND = 20.0 # Token bucket refill rate of each host
+BURST = 20 # Token bucket capacity: requests that can start at once after an idle period
+INITIAL_CONCURRENCY = 8 # Requests in flight per host when it is first seen
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 32
+LATENCY_TARGET = 5.0 # Seconds. Slower responses are a sign of an overloaded host, and decrease its concurrency
+DECREASE_FACTOR = 0.5 # Multiplicative decrease of the concurrency limit on throttling, server errors or slow responses
+DECREASE_COOLDOWN = 1.0 # Seconds after a decrease during which no other decrease is applied (requests already in flight fail together)
+RETRY_BACKOFF = 0.5 # Base delay (in seconds) of the exponential backoff between retries
+MAX_RETRY_DELAY = 60.0 # Seconds. Longer Retry-After values are capped
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLING_STATUS_CODES = {429, 503} # Status codes that may come with a Retry-After header
+LATENCY_SMOOTHING = 0.2 # Weight of the last response in the moving average of the latency of each host
+
+# Reasons why a request waits before starting, reported by `RateController.state()`
+RETRY_AFTER = "retry_after"
+RATE = "rate"
+CONCURRENCY = "concurrency"
+
+class RetryableRequestError(Exception):
+    """ A request failed with a transient error (connection error, timeout, 429 or 5xx), so it can be retried later.
+
+    `retry_after` is the delay requested by the server (Retry-After header), in seconds, if any.
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """ Get the seconds to wait from a Retry-After header, given as seconds or as an HTTP date. None if missing or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_DELAY)
+    try:
+        return min(max(0.0, parsedate_to_datetime(value).timestamp() - time.time()), MAX_RETRY_DELAY)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_retry_delay(attempt: int, retry_after: float | None = None, backoff: float = RETRY_BACKOFF) -> float:
+    """ Get the delay before retrying a request for the given attempt (0 for the first retry).
+
+    Exponential backoff with full jitter, so requests failing at the same time do not retry all at once,
+    and never shorter than the Retry-After delay requested by the server.
+    """
+    delay = random.uniform(0, backoff * 2 ** attempt)
+    return min(max(delay, retry_after or 0.0), MAX_RETRY_DELAY)
+
+
+class HostLimiter:
+    """ Rate and concurrency control of the requests to a single host. Not thread-safe: used under the lock of `RateController`.
+
+    - Token bucket: requests start at most at `requests_per_second`, with bursts of up to `burst` requests.
+    - AIMD concurrency: the limit of requests in flight grows by one every `limit` successful responses (additive increase),
+      and is halved on throttling (429), server errors, connection errors or responses slower than `latency_target`
+      (multiplicative decrease), at most once per `DECREASE_COOLDOWN`.
+    - Retry-After: no request starts until the delay requested by the host has passed.
+    """
+
+    def __init__(self, requests_per_second: float, burst: int, initial_concurrency: int, max_concurrency: int, latency_target: float):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.concurrency_limit = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.decreased_at = 0.0
+        self.latency_average: float | None = None
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.wait_seconds = {RETRY_AFTER: 0.0, RATE: 0.0, CONCURRENCY: 0.0}
+
+    def try_acquire(self) -> tuple[str | None, float]:
+        """ Start a request if allowed. Returns (None, 0) if started, or the reason it must wait and the suggested wait in seconds."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return RETRY_AFTER, self.blocked_until - now
+
+        if self.in_flight >= int(self.concurrency_limit):
+            return CONCURRENCY, 0.05 # Until a request finishes (waiters are notified)
+
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.requests_per_second)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return RATE, (1 - self.tokens) / self.requests_per_second
+
+        self.tokens -= 1
+        self.in_flight += 1
+        self.requests += 1
+        return None, 0.0
+
+    def release(self, latency: float, status_code: int | None, retry_after: float | None, failed: bool) -> None:
+        """ Finish a request, adjusting the concurrency limit with its outcome."""
+        self.in_flight -= 1
+        now = time.monotonic()
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+        is_throttled = status_code in THROTTLING_STATUS_CODES
+        is_error = failed or (status_code is not None and status_code >= 500 and not is_throttled)
+        self.throttled += is_throttled
+        self.errors += is_error
+        if not failed:
+            self.latency_average = latency if self.latency_average is None else (
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency_average
+            )
+
+        if is_throttled or is_error or latency > self.latency_target:
+            if now - self.decreased_at >= DECREASE_COOLDOWN:
+                self.concurrency_limit = max(MIN_CONCURRENCY, self.concurrency_limit * DECREASE_FACTOR)
+                self.decreased_at = now
+        else:
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+
+    def state(self) -> dict:
+        now = time.monotonic()
+        tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.requests_per_second)
+        waited_seconds = max(self.wait_seconds.values())
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "concurrency_limit": int(self.concurrency_limit),
+            "tokens": round(tokens, 2),
+            "requests_per_second": self.requests_per_second,
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 2),
+            "latency_average_seconds": round(self.latency_average, 3) if self.latency_average is not None else None,
+            "wait_seconds": {reason: round(seconds, 2) for reason, seconds in self.wait_seconds.items()},
+            # What requests waited for the most: the host (Retry-After), the rate limit, or the concurrency limit
+            "limited_by": max(self.wait_seconds, key=self.wait_seconds.get) if waited_seconds > 0 else None,
+        }
+
+
+class RequestSlot:
+    """ A request allowed to start by the `RateController`. Record its response with `record()` before the slot is released."""
+
+    def __init__(self):
+        self.status_code: int | None = None
+        self.retry_after: float | None = None
+
+    def record(self, status_code: int, retry_after: str | None = None) -> None:
+        """ Record the status code of the response, and its Retry-After header if any."""
+        self.status_code = status_code
+        self.retry_after = parse_retry_after(retry_after)
+
+
+class RateController:
+    """ Shared politeness and throughput control of the requests to each host (pages and images).
+
+    Each request is started through `request()` (or `request_async()` in coroutines), which waits until its host
+    allows it (see `HostLimiter`), and adapts the limits of the host with the outcome of the request:
+
+        with rate_controller.request(url) as request:
+            response = session.get(url)
+            request.record(status_code=response.status_code, retry_after=response.headers.get("Retry-After"))
+
+    Requests raising an exception count as failed. `state()` shows, for each host, its current limits and what
+    requests waited for the most, to find out what is limiting the throughput.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        burst: int = BURST,
+        initial_concurrency: int = INITIAL_CONCURRENCY,
+        max_concurrency: int = MAX_CONCURRENCY,
+        latency_target: float = LATENCY_TARGET,
+        metrics: MetricsRegistry|None = None,
+    ):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.hosts: dict[str, HostLimiter] = {}
+        self.condition = threading.Condition()
+        self.metrics = metrics or metrics_registry
+        self.logger = logging.getLogger(__name__)
+
+    @contextmanager
+    def request(self, url: str):
+        """ Wait until a request to the host of the URL is allowed, and yield its `RequestSlot`. Blocks the calling thread."""
+        host = self._get_host(url=url)
+        with self.condition:
+            while True:
+                reason, wait_seconds = self._try_acquire(host=host)
+                if reason is None:
+                    break
+                self._record_wait(host=host, reason=reason, seconds=wait_seconds)
+                self.condition.wait(timeout=wait_seconds)
+
+        with self._track(host=host) as request_slot:
+            yield request_slot
+
+    @asynccontextmanager
+    async def request_async(self, url: str):
+        """ Same as `request()`, but waiting without blocking the event loop."""
+        host = self._get_host(url=url)
+        while True:
+            with self.condition:
+                reason, wait_seconds = self._try_acquire(host=host)
+                if reason is not None:
+                    self._record_wait(host=host, reason=reason, seconds=wait_seconds)
+            if reason is None:
+                break
+            await asyncio.sleep(wait_seconds)
+
+        with self._track(host=host) as request_slot:
+            yield request_slot
+
+    def state(self) -> dict[str, dict]:
+        """ Get the current limits and counters of each host."""
+        with self.condition:
+            return {host: host_limiter.state() for host, host_limiter in self.hosts.items()}
+
+    def log_state(self) -> None:
+        for host, host_state in self.state().items():
+            self.logger.info(
+                f"🚦 {host}: {host_state['requests']} requests ({host_state['throttled']} throttled, {host_state['errors']} errors). "
+                f"Concurrency limit {host_state['concurrency_limit']}, {host_state['requests_per_second']:g} requests/s. "
+                f"Waited {host_state['wait_seconds']}, limited by: {host_state['limited_by'] or 'nothing'}"
+            )
+
+    @contextmanager
+    def _track(self, host: str):
+        """ Measure the request and release its slot with its outcome, waking up the requests waiting for it."""
+        request_slot = RequestSlot()
+        start_time = time.perf_counter()
+        failed = True
+        try:
+            yield request_slot
+            failed = False
+        finally:
+            latency = time.perf_counter() - start_time
+            with self.condition:
+                self.hosts[host].release(latency=latency, status_code=request_slot.status_code, retry_after=request_slot.retry_after, failed=failed)
+                self.condition.notify_all()
+            if request_slot.status_code in THROTTLING_STATUS_CODES:
+                self.metrics.increment("rate_control_throttled_total", host=host)
+
+    def _get_host(self, url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _try_acquire(self, host: str) -> tuple[str | None, float]:
+        host_limiter = self.hosts.get(host)
+        if host_limiter is None:
+            host_limiter = self.hosts[host] = HostLimiter(
+                requests_per_second=self.requests_per_second,
+                burst=self.burst,
+                initial_concurrency=self.initial_concurrency,
+                max_concurrency=self.max_concurrency,
+                latency_target=self.latency_target,
+            )
+        return host_limiter.try_acquire()
+
+    def _record_wait(self, host: str, reason: str, seconds: float) -> None:
+        """ Record the time a request is about to wait (at most), and why. Waits for the concurrency limit end when a request finishes."""
+        self.hosts[host].wait_seconds[reason] += seconds
+        self.metrics.increment("rate_control_wait_seconds_total", seconds, host=host, reason=reason)
@@ -0,0 +1,38 @@
+import time
+import heapq
+import itertools
+import threading
+from typing import Any
+
+
+class RetryQueue:
+    """ Thread-safe queue of failed work to retry later, each item once its delay (backoff) has passed.
+
+    Failed items are put back with their delay instead of sleeping in the thread that failed, so that thread
+    keeps doing other work meanwhile. Items are taken in the order they become due.
+    """
+
+    def __init__(self):
+        self.items: list[tuple[float, int, Any]] = [] # Heap of (due time, insertion order, item)
+        self.counter = itertools.count() # Keeps the insertion order of items due at the same time, without comparing them
+        self.condition = threading.Condition()
+
+    def put(self, item: Any, delay: float) -> None:
+        """ Queue the item to be retried in `delay` seconds."""
+        with self.condition:
+            heapq.heappush(self.items, (time.monotonic() + delay, next(self.counter), item))
+            self.condition.notify_all()
+
+    def get(self) -> Any | None:
+        """ Wait until the next item is due and return it, or None if the queue is empty."""
+        with self.condition:
+            while self.items:
+                wait_seconds = self.items[0][0] - time.monotonic()
+                if wait_seconds <= 0:
+                    return heapq.heappop(self.items)[2]
+                self.condition.wait(timeout=wait_seconds) # Woken up early if an item due sooner is put
+            return None
+
+    def __len__(self) -> int:
+        with self.condition:
+            return len(self.items)
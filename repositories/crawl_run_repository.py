@@ -0,0 +1,84 @@
+import logging
+from sqlite3 import Connection, Error
+
+
+# Statuses of a crawl run. Runs left "running" (the process crashed) or "failed" are resumed by the next scraping
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+RESUMABLE_STATUSES = (RUNNING, FAILED)
+
+class CrawlRunRepository:
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.logger = logging.getLogger(__name__)
+
+    def get_resumable_run(self) -> dict | None:
+        """Get the last crawl run, if it did not complete (it failed, or the process stopped while it was running).
+
+        Returns its id and the last page whose games were saved.
+        """
+
+        cursor = self.connection.cursor()
+        cursor.execute(
+            """
+                SELECT id, status, last_completed_page FROM crawl_runs
+                ORDER BY id DESC
+                LIMIT 1
+            """
+        )
+
+        crawl_run = cursor.fetchone()
+        if not crawl_run or crawl_run[1] not in RESUMABLE_STATUSES:
+            return None
+        return {"id": crawl_run[0], "last_completed_page": crawl_run[2]}
+
+    def create(self) -> int:
+        """Create a new running crawl run and return its id."""
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                    INSERT INTO crawl_runs (status) VALUES (:status)
+                    RETURNING id
+                """,
+                {"status": RUNNING}
+            )
+            crawl_run_id = cursor.fetchone()[0]
+            self.connection.commit()
+        except Error:
+            self.connection.rollback()
+            raise
+        return crawl_run_id
+
+    def update_last_completed_page(self, crawl_run_id: int, page_number: int) -> None:
+        """Checkpoint a crawl run: record the last page whose games were saved."""
+
+        self._execute_and_commit(
+            """
+                UPDATE crawl_runs SET last_completed_page = :page_number WHERE id = :id
+            """,
+            {"id": crawl_run_id, "page_number": page_number}
+        )
+
+    def set_status(self, crawl_run_id: int, status: str) -> None:
+        """Set the status of a crawl run. Completed and failed runs get their finish time set."""
+
+        self._execute_and_commit(
+            """
+                UPDATE crawl_runs
+                SET status = :status,
+                    finished_at = CASE WHEN :status = :running THEN NULL ELSE CURRENT_TIMESTAMP END
+                WHERE id = :id
+            """,
+            {"id": crawl_run_id, "status": status, "running": RUNNING}
+        )
+
+    def _execute_and_commit(self, query: str, parameters: dict) -> None:
+        try:
+            self.connection.execute(query, parameters)
+            self.connection.commit()
+        except Error:
+            self.connection.rollback()
+            raise
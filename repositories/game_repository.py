@@ -1,13 +1,29 @@
+import time
 import logging
-from sqlite3 import Connection, Cursor
+from typing import Iterator
+from sqlite3 import Connection, Cursor, Error
 
 from models.game import Game
+from metrics.registry import MetricsRegistry, metrics_registry
+
 
 class GameRepository:
-    def __init__(self, connection: Connection):
+    def __init__(self, connection: Connection, metrics: MetricsRegistry|None = None):
         self.connection = connection
+        self.metrics = metrics or metrics_registry
         self.logger = logging.getLogger(__name__)
 
+        # In-process cache of category name -> id. Warmed from the categories table on first use,
+        # filled in on insert, and dropped if a transaction is rolled back.
+        self._categories_ids_cache: dict[str, int] | None = None
+        self.category_cache_hits = 0
+        self.category_cache_misses = 0
+
+        # Games saved by `upsert_many()` since the last `reset_upsert_stats()`, by whether they were written or not
+        self.new_games = 0
+        self.changed_games = 0
+        self.unchanged_games = 0
+
     def get_game_id_by_website_id(self, website_id:int) -> int|None :
         """Get game id by website id.
         
@@ -43,14 +59,18 @@ class GameRepository:
         cursor = self.connection.cursor()
 
         # Get dict for creating the game
-        create_game_dict = game.to_create_db_dict()
-
-        game_id = self._insert_game(cursor=cursor, game_dict=create_game_dict)
-        categories_ids_of_game = self._insert_categories_and_get_ids(cursor=cursor, game_dict=create_game_dict)
-        if categories_ids_of_game:
-            self._insert_game_categories(cursor=cursor, game_id=game_id, categories_id=categories_ids_of_game)
-
-        self.connection.commit()
+        create_game_dict = {**game.to_create_db_dict(), "fingerprint": game.get_fingerprint()}
+
+        try:
+            game_id = self._insert_game(cursor=cursor, game_dict=create_game_dict)
+            categories_ids_of_game = self._insert_categories_and_get_ids(cursor=cursor, game_dict=create_game_dict)
+            if categories_ids_of_game:
+                self._insert_game_categories(cursor=cursor, game_id=game_id, categories_id=categories_ids_of_game)
+
+            self.connection.commit()
+        except Error:
+            self._rollback()
+            raise
         return True
 
     def update(self, game:Game, game_id: int) -> bool:
@@ -72,22 +92,176 @@ class GameRepository:
         game.set_id(id=game_id)
 
         # Get dict for updating the game
-        update_game_dict = game.to_update_db_dict()
-
-        self._update_game(cursor=cursor, game_dict=update_game_dict)
-        self._delete_game_categories_by_game_id(cursor=cursor, game_id=game_id)
-        updated_categories_ids_of_game = self._insert_categories_and_get_ids(cursor=cursor, game_dict=update_game_dict)
-        if updated_categories_ids_of_game:
-            self._insert_game_categories(cursor=cursor, game_id=game_id, categories_id=updated_categories_ids_of_game)
-        
-        self.connection.commit()
+        update_game_dict = {**game.to_update_db_dict(), "fingerprint": game.get_fingerprint()}
+
+        try:
+            self._update_game(cursor=cursor, game_dict=update_game_dict)
+            self._delete_game_categories_by_game_id(cursor=cursor, game_id=game_id)
+            updated_categories_ids_of_game = self._insert_categories_and_get_ids(cursor=cursor, game_dict=update_game_dict)
+            if updated_categories_ids_of_game:
+                self._insert_game_categories(cursor=cursor, game_id=game_id, categories_id=updated_categories_ids_of_game)
+            
+            self.connection.commit()
+        except Error:
+            self._rollback()
+            raise
         return True
     
+    def upsert_many(self, games: list[Game]) -> bool:
+        """Create or update a batch of games (e.g. all games of a page) in a single transaction.
+        
+        Steps:
+            - First, get the ids and content fingerprints of the games of the batch that already exist (same website id), with a single query.
+              Games whose fingerprint did not change are unchanged: their ids are set in the Game entities, and they are not written.
+            - Then, insert the new and changed games into the games table. Games that already exist are updated instead,
+              with the same fields as `update()` (using an `INSERT ... ON CONFLICT(website_id) DO UPDATE` statement).
+            - Next, get the ids of the new games with a single query, and set them in the Game entities.
+            - Next, insert the categories of the written games that are new, and get the ids of all of them (using `_insert_categories_and_get_ids_by_name()` method).
+            - Finally, replace the game-category relationships of the written games.
+
+        If a game appears more than once in the batch, its last occurrence wins, as if the games were saved one by one.
+        If all games are unchanged, nothing is written. If anything fails (or the batch is interrupted), the whole batch is rolled back
+        and the categories cache is dropped.
+        The number of new, changed and unchanged games is added to the upsert stats (see `get_upsert_stats()`),
+        and recorded in the metrics with the time spent on the batch.
+        """
+
+        games_to_save = []
+        for game in games:
+            if game.website_id is None:
+                self.logger.warning(f"⚠️ Game {game.name} has no website id, can not save it. Skipping....")
+                continue
+            games_to_save.append(game)
+
+        if not games_to_save:
+            return True
+
+        start_time = time.perf_counter()
+        cursor = self.connection.cursor()
+        try:
+            # Compare the fingerprints of the games with the saved ones. The last occurrence of each game wins
+            fingerprints_by_website_id = {game.website_id: game.get_fingerprint() for game in games_to_save}
+            saved_games = self._get_games_ids_and_fingerprints_by_website_ids(cursor=cursor, website_ids=list(fingerprints_by_website_id))
+            games_to_write = {}
+            for game in games_to_save:
+                saved_game = saved_games.get(game.website_id)
+                if saved_game is not None:
+                    game.set_id(id=saved_game[0])
+                if saved_game is None or saved_game[1] != fingerprints_by_website_id[game.website_id]:
+                    games_to_write[game.website_id] = game
+
+            new_website_ids = [website_id for website_id in games_to_write if website_id not in saved_games]
+            new_games = len(new_website_ids)
+            changed_games = len(games_to_write) - new_games
+            unchanged_games = len(fingerprints_by_website_id) - len(games_to_write)
+            if not games_to_write:
+                self._record_upsert(new_games=0, changed_games=0, unchanged_games=unchanged_games, seconds=time.perf_counter() - start_time)
+                return True
+
+            # Positional parameters (see `Game.to_create_db_tuple()`): tuples are cheaper to build than dicts on bulk writes
+            cursor.executemany(
+                """
+                    INSERT INTO games (website_id, name, description, price, sale_price, image_url, has_stock, url, fingerprint)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(website_id) DO UPDATE
+                    SET description = excluded.description,
+                        price = excluded.price,
+                        sale_price = excluded.sale_price,
+                        image_url = excluded.image_url,
+                        has_stock = excluded.has_stock,
+                        fingerprint = excluded.fingerprint
+                """,
+                [(*game.to_create_db_tuple(), fingerprints_by_website_id[website_id]) for website_id, game in games_to_write.items()]
+            )
+
+            games_ids = {website_id: saved_game[0] for website_id, saved_game in saved_games.items()}
+            if new_website_ids:
+                games_ids.update(self._get_games_ids_by_website_ids(cursor=cursor, website_ids=new_website_ids))
+
+            categories_names_by_game_id = {}
+            for game in games_to_save:
+                game.set_id(id=games_ids[game.website_id])
+            for website_id, game in games_to_write.items():
+                categories_names_by_game_id[games_ids[website_id]] = list(dict.fromkeys(game.categories or [])) # Remove duplicated categories, keeping their order
+
+            all_categories_names = list(dict.fromkeys(name for names in categories_names_by_game_id.values() for name in names))
+            categories_ids = self._insert_categories_and_get_ids_by_name(cursor=cursor, categories_names=all_categories_names)
+
+            cursor.executemany(
+                "DELETE FROM game_category WHERE game_id = :game_id",
+                [{"game_id": game_id} for game_id in categories_names_by_game_id]
+            )
+            cursor.executemany(
+                """
+                    INSERT INTO game_category (game_id, category_id) VALUES (:game_id, :category_id)
+                """,
+                [
+                    {"game_id": game_id, "category_id": categories_ids[category_name]}
+                    for game_id, categories_names in categories_names_by_game_id.items()
+                    for category_name in categories_names
+                ]
+            )
+            self.connection.commit()
+
+        except BaseException as e: # Not only database errors: the transaction must not stay open (e.g. on KeyboardInterrupt)
+            self._rollback()
+            self.metrics.increment("db_errors_total", operation="upsert_many")
+            self.logger.error(f"❌ Error during saving a batch of {len(games_to_save)} games: {e}. Changes rolled back.")
+            raise
+
+        self._record_upsert(new_games=new_games, changed_games=changed_games, unchanged_games=unchanged_games, seconds=time.perf_counter() - start_time)
+        return True
+
+    def _record_upsert(self, new_games: int, changed_games: int, unchanged_games: int, seconds: float) -> None:
+        """Add a saved batch of games to the upsert stats and the metrics. Unchanged games are not written, so they do not count in the time per written game."""
+
+        self.new_games += new_games
+        self.changed_games += changed_games
+        self.unchanged_games += unchanged_games
+
+        self.metrics.observe("db_upsert_batch_seconds", seconds)
+        for result, games_count in (("new", new_games), ("changed", changed_games), ("unchanged", unchanged_games)):
+            self.metrics.increment("db_games_total", games_count, result=result)
+        written_games = new_games + changed_games
+        if written_games:
+            self.metrics.observe("db_game_write_seconds", seconds / written_games)
+
+    def get_upsert_stats(self) -> dict:
+        """Get the number of new, changed and unchanged games saved by `upsert_many()`."""
+
+        return {
+            "new": self.new_games,
+            "changed": self.changed_games,
+            "unchanged": self.unchanged_games,
+        }
+
+    def reset_upsert_stats(self) -> None:
+        """Reset the counters of new, changed and unchanged games (e.g. at the start of a scraping run)."""
+
+        self.new_games = 0
+        self.changed_games = 0
+        self.unchanged_games = 0
+
+    def get_category_cache_stats(self) -> dict:
+        """Get the hit/miss counters of the category name -> id cache."""
+
+        lookups = self.category_cache_hits + self.category_cache_misses
+        return {
+            "hits": self.category_cache_hits,
+            "misses": self.category_cache_misses,
+            "hit_rate": self.category_cache_hits / lookups if lookups else 0.0,
+            "size": len(self._categories_ids_cache or {}),
+        }
+
     def get_games_by_category_name(self, category_name:str) -> list[Game] | None:
         """Get all games that belong to a specific category by category name.
         
         This method retrieves all games associated with the given category name from the database.
         It is used to write games data into category-specific CSV.
+
+        It runs two queries, whatever the number of games:
+            - One to get the games of the category.
+            - One to get the categories names of all those games (using `_get_categories_names_by_category_games()` method).
         """
         cursor = self.connection.cursor()
 
@@ -106,9 +280,9 @@ class GameRepository:
                     g.sale_price
                 FROM
                     categories c
-                LEFT JOIN game_category gc ON
+                INNER JOIN game_category gc ON
                     c.id = gc.category_id
-                LEFT JOIN games g ON
+                INNER JOIN games g ON
                     g.id = gc.game_id
                 WHERE
                     c.name = :category_name
@@ -120,11 +294,12 @@ class GameRepository:
         games = cursor.fetchall()
         if not games:
             return None
+
+        # Get categories names of all the games. Necessaries to build the Game entities.
+        categories_names_by_game_id = self._get_categories_names_by_category_games(cursor=cursor, category_name=category_name)
         
         for game_data in games:
-            # Get categories names of the game. Necessaries to build the Game entity.
             game_id = game_data[0]
-            category_names_of_game = self._get_categories_names_by_game_id(cursor=cursor, game_id=game_id)
             game = Game(
                 id=game_id,
                 website_id=game_data[1],
@@ -135,12 +310,48 @@ class GameRepository:
                 has_stock=game_data[6],
                 url=game_data[7],
                 sale_price=game_data[8],
-                categories=category_names_of_game            
+                categories=categories_names_by_game_id.get(game_id)
             )
             games_entities.append(game)
 
         return games_entities
 
+    def iter_games_rows_by_category(self, category_name: str | None = None) -> Iterator[tuple]:
+        """Iterate over the CSV rows of the games of all categories (or only of the given one), using a single ordered query.
+
+        Rows are ordered by category name, then by game price (descending) and name, and have the same fields as
+        `Game.to_row()`, preceded by the category name. They are streamed from the database cursor one by one,
+        so memory usage does not depend on the number of games. The stock status is computed by the query, so each row
+        is the tuple built by SQLite, without any other allocation.
+        """
+        cursor = self.connection.cursor()
+
+        cursor.execute(
+            """
+                SELECT
+                    c.name,
+                    g.name,
+                    g.price,
+                    CASE WHEN g.has_stock THEN :in_stock ELSE :out_of_stock END,
+                    g.url
+                FROM
+                    categories c
+                INNER JOIN game_category gc ON
+                    c.id = gc.category_id
+                INNER JOIN games g ON
+                    g.id = gc.game_id
+                WHERE :category_name IS NULL OR c.name = :category_name
+                ORDER BY c.name ASC, g.price DESC, g.name ASC
+            """,
+            {
+                "category_name": category_name,
+                "in_stock": Game.get_stock_status(has_stock=True),
+                "out_of_stock": Game.get_stock_status(has_stock=False),
+            }
+        )
+
+        yield from cursor
+
     def get_images_url_and_product_id(self) -> list[tuple[str, int]] | None:
         """ This method retrieves all games' image URLs along with their product IDs from the database.
 
@@ -179,27 +390,41 @@ class GameRepository:
 
         return [category[0] for category in result]
 
-    def _get_categories_names_by_game_id(self, cursor: Cursor, game_id: int) -> list[str]:
-        """Get category names of a game by its id."""
+    def _get_categories_names_by_category_games(self, cursor: Cursor, category_name: str) -> dict[int, list[str]]:
+        """Get the category names of all the games of a category, as a game id -> category names mapping."""
 
         cursor.execute(
             """
-                SELECT c.name
-                FROM categories c
-                INNER JOIN game_category gc ON c.id = gc.category_id
-                WHERE gc.game_id = :game_id;
+                SELECT gc.game_id, c.name
+                FROM game_category gc
+                INNER JOIN categories c ON c.id = gc.category_id
+                WHERE gc.game_id IN (
+                    SELECT category_gc.game_id
+                    FROM game_category category_gc
+                    INNER JOIN categories category_c ON category_c.id = category_gc.category_id
+                    WHERE category_c.name = :category_name
+                )
+                ORDER BY gc.game_id, gc.category_id;
             """,
-            {"game_id": game_id}
+            {"category_name": category_name}
         )
 
-        result = cursor.fetchall()
-        if not result:
-            return None
-
-        return [category[0] for category in result]
+        categories_names_by_game_id = {}
+        for game_id, category_name_of_game in cursor.fetchall():
+            categories_names_by_game_id.setdefault(game_id, []).append(category_name_of_game)
+        return categories_names_by_game_id
     
     def _get_category_id_by_name(self, cursor: Cursor, category_name:str) -> int|None :
-        """Get category id by its name."""
+        """Get category id by its name.
+
+        The id is taken from the categories cache if present. Otherwise, it is looked up in the database.
+        """
+
+        categories_ids_cache = self._get_categories_ids_cache(cursor=cursor)
+        if category_name in categories_ids_cache:
+            self.category_cache_hits += 1
+            return categories_ids_cache[category_name]
+        self.category_cache_misses += 1
 
         cursor.execute(
             """
@@ -212,8 +437,26 @@ class GameRepository:
         if not category_id:
             return None
 
+        categories_ids_cache[category_name] = category_id[0]
         return category_id[0]
 
+    def _get_categories_ids_cache(self, cursor: Cursor) -> dict[str, int]:
+        """Get the category name -> id cache, warming it from the categories table on first use."""
+
+        if self._categories_ids_cache is None:
+            cursor.execute("SELECT name, id FROM categories")
+            self._categories_ids_cache = dict(cursor.fetchall())
+        return self._categories_ids_cache
+
+    def _rollback(self) -> None:
+        """Roll back the current transaction.
+
+        The categories cache is dropped, as it may contain categories inserted in the rolled back transaction.
+        """
+
+        self.connection.rollback()
+        self._categories_ids_cache = None
+
     def _insert_categories_and_get_ids(self, cursor: Cursor, game_dict: dict) -> list[int]|None:
         """This method inserts the categories of a game into the categories table and returns their ids.
 
@@ -244,17 +487,89 @@ class GameRepository:
                     continue
 
                 category_id = result[0]
+                self._categories_ids_cache[category_name] = category_id
             
             categories_ids.append(category_id)
         return categories_ids
 
+    def _get_games_ids_by_website_ids(self, cursor: Cursor, website_ids: list[int]) -> dict[int, int]:
+        """Get the ids of games by their website ids, as a website id -> id mapping."""
+
+        placeholders = ", ".join("?" for _ in website_ids)
+        cursor.execute(
+            f"""
+                SELECT website_id, id FROM games WHERE website_id IN ({placeholders})
+            """,
+            website_ids
+        )
+        return dict(cursor.fetchall())
+
+    def _get_games_ids_and_fingerprints_by_website_ids(self, cursor: Cursor, website_ids: list[int]) -> dict[int, tuple[int, str | None]]:
+        """Get the ids and content fingerprints of games by their website ids, as a website id -> (id, fingerprint) mapping."""
+
+        placeholders = ", ".join("?" for _ in website_ids)
+        cursor.execute(
+            f"""
+                SELECT website_id, id, fingerprint FROM games WHERE website_id IN ({placeholders})
+            """,
+            website_ids
+        )
+        return {website_id: (game_id, fingerprint) for website_id, game_id, fingerprint in cursor.fetchall()}
+
+    def _insert_categories_and_get_ids_by_name(self, cursor: Cursor, categories_names: list[str]) -> dict[str, int]:
+        """Insert the categories that do not exist yet and return the ids of all of them, as a name -> id mapping.
+
+        Categories are resolved from the categories cache first. Those not cached are looked up in the database
+        with a single query, and only the missing ones are inserted, in the given order, so they get the same ids
+        as when inserted one by one.
+        """
+
+        categories_ids_cache = self._get_categories_ids_cache(cursor=cursor)
+        categories_ids = {}
+        not_cached_categories_names = []
+        for category_name in categories_names:
+            if category_name in categories_ids_cache:
+                categories_ids[category_name] = categories_ids_cache[category_name]
+            else:
+                not_cached_categories_names.append(category_name)
+
+        self.category_cache_hits += len(categories_ids)
+        self.category_cache_misses += len(not_cached_categories_names)
+        if not not_cached_categories_names:
+            return categories_ids
+
+        placeholders = ", ".join("?" for _ in not_cached_categories_names)
+        cursor.execute(
+            f"""
+                SELECT name, id FROM categories WHERE name IN ({placeholders})
+            """,
+            not_cached_categories_names
+        )
+        categories_ids.update(cursor.fetchall())
+
+        for category_name in not_cached_categories_names:
+            if category_name in categories_ids:
+                continue
+
+            cursor.execute(
+                """
+                    INSERT INTO categories (name) VALUES (:category_name)
+                    RETURNING id
+                """,
+                {"category_name": category_name}
+            )
+            categories_ids[category_name] = cursor.fetchone()[0]
+
+        categories_ids_cache.update(categories_ids)
+        return categories_ids
+
     def _insert_game(self, cursor: Cursor, game_dict: dict) -> int:
         """Insert a new game into the games table and return its id."""
 
         cursor.execute(
             """
-                INSERT INTO games (website_id, name, description, price, sale_price, image_url, has_stock, url)
-                VALUES (:website_id, :name, :description, :price, :sale_price, :image_url, :has_stock, :url)
+                INSERT INTO games (website_id, name, description, price, sale_price, image_url, has_stock, url, fingerprint)
+                VALUES (:website_id, :name, :description, :price, :sale_price, :image_url, :has_stock, :url, :fingerprint)
                 RETURNING id
             """, 
             game_dict
@@ -301,7 +616,8 @@ class GameRepository:
                     price = :price,
                     sale_price = :sale_price,
                     image_url = :image_url,
-                    has_stock = :has_stock
+                    has_stock = :has_stock,
+                    fingerprint = :fingerprint
                 WHERE id = :id
             """, 
             game_dict
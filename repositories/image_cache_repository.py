@@ -0,0 +1,72 @@
+import logging
+import threading
+from sqlite3 import Connection, Error
+
+
+class ImageCacheRepository:
+    """HTTP cache of the downloaded images: ETag, Last-Modified and content hash of each image URL.
+
+    It is used to revalidate images with conditional requests instead of downloading them again.
+    It is shared by all the image download threads, so the connection must be created with `check_same_thread=False`.
+    """
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.lock = threading.Lock() # Serializes the use of the connection by the download threads
+        self.logger = logging.getLogger(__name__)
+
+    def create_table(self) -> None:
+        """Create the image cache table, if it does not exist."""
+
+        with self.lock:
+            self.connection.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS image_cache
+                        (
+                            url TEXT PRIMARY KEY,
+                            etag TEXT,
+                            last_modified TEXT,
+                            content_hash TEXT NOT NULL
+                        );
+                """
+            )
+            self.connection.commit()
+
+    def get_by_url(self, url: str) -> dict | None:
+        """Get the cached validators (etag and last_modified) and content hash of an image URL."""
+
+        with self.lock:
+            cursor = self.connection.execute(
+                """
+                    SELECT etag, last_modified, content_hash FROM image_cache WHERE url = :url
+                """,
+                {"url": url}
+            )
+            cache_entry = cursor.fetchone()
+
+        if not cache_entry:
+            return None
+        etag, last_modified, content_hash = cache_entry
+        return {"etag": etag, "last_modified": last_modified, "content_hash": content_hash}
+
+    def save(self, url: str, etag: str | None, last_modified: str | None, content_hash: str) -> bool:
+        """Save the validators and content hash of a downloaded image URL, replacing the previous ones."""
+
+        with self.lock:
+            try:
+                self.connection.execute(
+                    """
+                        INSERT INTO image_cache (url, etag, last_modified, content_hash)
+                        VALUES (:url, :etag, :last_modified, :content_hash)
+                        ON CONFLICT(url) DO UPDATE
+                        SET etag = excluded.etag,
+                            last_modified = excluded.last_modified,
+                            content_hash = excluded.content_hash
+                    """,
+                    {"url": url, "etag": etag, "last_modified": last_modified, "content_hash": content_hash}
+                )
+                self.connection.commit()
+            except Error:
+                self.connection.rollback()
+                raise
+        return True
@@ -0,0 +1,369 @@
+import time
+import asyncio
+import logging
+import requests
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+from rate_control.rate_controller import RateController, RetryableRequestError, RETRYABLE_STATUS_CODES, get_retry_delay
+
+# Playwright is only imported when a browser is launched, so HTTP-only runs do not load it
+if TYPE_CHECKING:
+    from playwright.sync_api import Playwright, Browser, BrowserContext, Page, Route
+    from playwright.async_api import Playwright as AsyncPlaywright, Browser as AsyncBrowser, BrowserContext as AsyncBrowserContext, Page as AsyncPage, Route as AsyncRoute
+
+
+# Scrolls each product card without image into view (to trigger its lazy load) until every card has its
+# `srcset` filled in, the number of cards and filled cards stops growing for `stableTime` ms, or `timeout` ms pass.
+# Until cards or the pagination are rendered, the page is not considered stable: it waits for them up to `timeout` ms.
+PAGE_READY_SCRIPT = """
+async ({timeout, stableTime}) => {
+    const start = performance.now();
+    const cardsSelector = 'div.product-card';
+    const readyCardsSelector = 'div.product-card img.image[srcset]:not([srcset=""])';
+    const paginationSelector = 'ul.pagination';
+
+    let readyCards = -1;
+    let renderedCards = -1;
+    let lastChange = start;
+    while (performance.now() - start < timeout) {
+        const cards = document.querySelectorAll(cardsSelector);
+        const currentReadyCards = document.querySelectorAll(readyCardsSelector).length;
+        if (currentReadyCards !== readyCards || cards.length !== renderedCards) {
+            readyCards = currentReadyCards;
+            renderedCards = cards.length;
+            lastChange = performance.now();
+        }
+        if (cards.length > 0 && readyCards >= cards.length) break;
+        const isRendered = cards.length > 0 || document.querySelector(paginationSelector) !== null;
+        if (isRendered && performance.now() - lastChange >= stableTime) break;
+
+        const pendingCard = [...cards].find(card => !card.querySelector('img.image[srcset]:not([srcset=""])'));
+        if (pendingCard) {
+            pendingCard.scrollIntoView({block: 'center'});
+        } else {
+            window.scrollTo(0, document.body.scrollHeight);
+        }
+        await new Promise(r => setTimeout(r, 50));
+    }
+
+    const elapsed = performance.now() - start;
+    return {
+        elapsed: elapsed,
+        cards: document.querySelectorAll(cardsSelector).length,
+        readyCards: document.querySelectorAll(readyCardsSelector).length,
+        timedOut: elapsed >= timeout,
+    };
+}
+"""
+# Bytes transferred by the page (document and resources) and its number of resources, from the Resource Timing API.
+# Cross-origin resources without a Timing-Allow-Origin header report 0 bytes
+PAGE_STATS_SCRIPT = """
+() => {
+    const entries = [...performance.getEntriesByType('navigation'), ...performance.getEntriesByType('resource')];
+    return {
+        transferSize: entries.reduce((total, entry) => total + (entry.transferSize || 0), 0),
+        resources: entries.length,
+    };
+}
+"""
+PAGE_READY_TIMEOUT = 10 # Seconds to wait for the lazy loaded products data of a page
+PAGE_READY_STABLE_TIME = 0.3 # Seconds without new loaded products after which a page is considered ready
+
+HTTP_TIMEOUT = 10
+PAGE_MAX_RETRIES = 3 # Retries of a page load failing with a retryable error (connection error, timeout, 429 or 5xx)
+
+# Lean browser mode: only the listing DOM is needed. Images are blocked once requested, so their `srcset` attributes are kept
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOSTS = ( # Analytics and tracking hosts (and their subdomains)
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "facebook.net", "hotjar.com", "segment.io", "clarity.ms",
+)
+LEAN_WAIT_UNTIL = "domcontentloaded" # The readiness script waits for the products data, so the other resources are not awaited
+FULL_WAIT_UNTIL = "load"
+LEAN_CONTEXT_OPTIONS = {"service_workers": "block"} # Requests made by service workers would not go through the routes
+
+
+class RateControlMixin:
+    """ Shared request pacing and retry logic of the page loaders.
+
+    Each page request waits until the `RateController` allows a request to the host, and reports its outcome to it.
+    Pages failing with a retryable error are loaded again in place, after an exponential backoff (or the delay
+    requested by the server), as the scraper needs each page before moving on.
+    """
+
+    def _init_rate_control(self, rate_controller: RateController|None, max_retries: int) -> None:
+        self.rate_controller = rate_controller or RateController()
+        self.max_retries = max_retries
+        self.logger = logging.getLogger(__name__)
+
+    def _get_retry_delay(self, url: str, error: str, retry_after: float | None, attempt: int) -> float:
+        """ Get the delay before loading the page again, or raise a `RetryableRequestError` if it is out of retries."""
+        if attempt == self.max_retries:
+            raise RetryableRequestError(f"Error loading {url} after {attempt} retries: {error}", retry_after=retry_after)
+
+        delay = get_retry_delay(attempt=attempt, retry_after=retry_after)
+        self.logger.warning(f"⚠️ Error loading {url}: {error}. Retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})...")
+        return delay
+
+
+class HttpPageLoader(RateControlMixin):
+    """ Load listing pages with a pooled HTTP client, without launching a browser.
+
+    The HTML is returned as served by the website, so it only works for pages whose products data
+    is present in the static markup. The scraper loads the pages rendered by scripts again with the browser.
+    """
+
+    def __init__(self, pool_size: int = 1, rate_controller: RateController|None = None, max_retries: int = PAGE_MAX_RETRIES):
+        self._init_rate_control(rate_controller=rate_controller, max_retries=max_retries)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def load(self, url: str) -> str|None:
+        """ Get the HTML of the page as served, or None if the page could not be fetched (after its retries)."""
+        try:
+            response = self._get(url=url)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.logger.warning(f"⚠️ Error fetching {url} over HTTP: {e}. Falling back to the browser.")
+            return None
+
+        return response.text
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _get(self, url: str) -> requests.Response:
+        """ Request the page, retrying on connection errors, timeouts and retryable status codes (429 and 5xx)."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.rate_controller.request(url=url) as request_slot:
+                    response = self.session.get(url, timeout=HTTP_TIMEOUT)
+                    request_slot.record(status_code=response.status_code, retry_after=response.headers.get("Retry-After"))
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                error, retry_after = f"{response.status_code} status code", request_slot.retry_after
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, retry_after = str(e), None
+
+            try:
+                delay = self._get_retry_delay(url=url, error=error, retry_after=retry_after, attempt=attempt)
+            except RetryableRequestError as e:
+                raise requests.RequestException(str(e)) from e
+            time.sleep(delay)
+
+
+class PageReadinessMixin:
+    """ Shared page readiness logic of the browser page loaders.
+
+    Instead of scrolling the whole document with a fixed delay, a page is considered ready as soon as
+    all its product cards have their images `srcset` filled in, or their number stops growing.
+    The time each page took to become ready is stored in `ready_times` (in seconds) to help tuning it,
+    and the navigation time and bytes transferred of each page in `page_stats`.
+    """
+
+    def _init_readiness(self, ready_timeout: float) -> None:
+        self.ready_timeout = ready_timeout
+        self.ready_times: list[float] = []
+        self.page_stats: list[dict] = []
+        self.logger = logging.getLogger(__name__)
+
+    def _get_readiness_args(self) -> dict:
+        return {"timeout": self.ready_timeout * 1000, "stableTime": PAGE_READY_STABLE_TIME * 1000}
+
+    def _record_readiness(self, url: str, readiness: dict) -> None:
+        ready_time = readiness["elapsed"] / 1000
+        self.ready_times.append(ready_time)
+        message = f"Page {url} ready in {ready_time:.2f}s ({readiness['readyCards']}/{readiness['cards']} products with images)"
+        if readiness["timedOut"]:
+            self.logger.warning(f"⚠️ {message}. Timeout reached.")
+        else:
+            self.logger.debug(message)
+
+    def _record_page_stats(self, url: str, navigation_seconds: float, page_stats: dict) -> None:
+        self.page_stats.append({"navigation_seconds": navigation_seconds, "transfer_bytes": page_stats["transferSize"], "resources": page_stats["resources"]})
+        self.logger.debug(f"Page {url} navigated in {navigation_seconds:.2f}s, {page_stats['transferSize'] / 1000:.1f} KB in {page_stats['resources']} requests")
+
+
+class LeanBrowserMixin:
+    """ Shared browser configuration of the browser page loaders.
+
+    All pages are opened in a single browser context. In lean mode, the context aborts the requests of images, media,
+    fonts and analytics (see `BLOCKED_RESOURCE_TYPES` and `BLOCKED_HOSTS`), as only the DOM of the listing is parsed,
+    and navigations return once the DOM is loaded instead of waiting for every resource.
+    The number of requests blocked is stored in `blocked_requests`.
+    """
+
+    def _init_lean(self, lean: bool) -> None:
+        self.lean = lean
+        self.wait_until = LEAN_WAIT_UNTIL if lean else FULL_WAIT_UNTIL
+        self.blocked_requests = 0
+
+    def _get_context_options(self) -> dict:
+        return LEAN_CONTEXT_OPTIONS if self.lean else {}
+
+    def _should_block(self, resource_type: str, url: str) -> bool:
+        hostname = urlsplit(url).hostname or ""
+        if resource_type in BLOCKED_RESOURCE_TYPES or any(hostname == host or hostname.endswith(f".{host}") for host in BLOCKED_HOSTS):
+            self.blocked_requests += 1
+            return True
+        return False
+
+
+class BrowserPageLoader(PageReadinessMixin, RateControlMixin, LeanBrowserMixin):
+    """ Load listing pages with a headless Chromium page.
+
+    The browser is only launched the first time a page is loaded, so callers that rarely need it
+    (e.g. as a fallback of `HttpPageLoader`) do not pay for it.
+    """
+
+    def __init__(
+        self,
+        ready_timeout: float = PAGE_READY_TIMEOUT,
+        rate_controller: RateController|None = None,
+        max_retries: int = PAGE_MAX_RETRIES,
+        lean: bool = False,
+    ):
+        self._init_readiness(ready_timeout=ready_timeout)
+        self._init_rate_control(rate_controller=rate_controller, max_retries=max_retries)
+        self._init_lean(lean=lean)
+        self._playwright: "Playwright|None" = None
+        self._browser: "Browser|None" = None
+        self._context: "BrowserContext|None" = None
+        self._page: "Page|None" = None
+
+    def load(self, url: str) -> str:
+        """ Navigate to the page, wait until all its products data is loaded and return its HTML.
+
+        Navigations failing with a retryable error are retried. Raises `RetryableRequestError` once out of retries.
+        """
+        from playwright.sync_api import sync_playwright, Error as PlaywrightError
+        if self._page is None:
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=True)
+            self._context = self._browser.new_context(**self._get_context_options())
+            if self.lean:
+                self._context.route("**/*", self._route)
+            self._page = self._context.new_page()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.rate_controller.request(url=url) as request_slot:
+                    start_time = time.perf_counter()
+                    response = self._page.goto(url, wait_until=self.wait_until)
+                    navigation_seconds = time.perf_counter() - start_time
+                    if response is not None:
+                        request_slot.record(status_code=response.status, retry_after=response.headers.get("retry-after"))
+                if response is None or response.status not in RETRYABLE_STATUS_CODES:
+                    break
+                error, retry_after = f"{response.status} status code", request_slot.retry_after
+            except PlaywrightError as e:
+                error, retry_after = e.message, None
+            time.sleep(self._get_retry_delay(url=url, error=error, retry_after=retry_after, attempt=attempt))
+
+        readiness = self._page.evaluate(PAGE_READY_SCRIPT, self._get_readiness_args())
+        self._record_readiness(url=url, readiness=readiness)
+        self._record_page_stats(url=url, navigation_seconds=navigation_seconds, page_stats=self._page.evaluate(PAGE_STATS_SCRIPT))
+        return self._page.content()
+
+    def close(self) -> None:
+        if self._browser:
+            self._browser.close()
+        if self._playwright:
+            self._playwright.stop()
+        self._playwright, self._browser, self._context, self._page = None, None, None, None
+
+    def _route(self, route: "Route") -> None:
+        if self._should_block(resource_type=route.request.resource_type, url=route.request.url):
+            route.abort()
+        else:
+            route.continue_()
+
+
+class AsyncBrowserPageLoader(PageReadinessMixin, RateControlMixin, LeanBrowserMixin):
+    """ Load listing pages concurrently with a pool of tabs of a single headless Chromium browser.
+
+    The browser is launched on the first load, and tabs are opened on demand up to `max_tabs`, all in the same context.
+    """
+
+    def __init__(
+        self,
+        max_tabs: int,
+        ready_timeout: float = PAGE_READY_TIMEOUT,
+        rate_controller: RateController|None = None,
+        max_retries: int = PAGE_MAX_RETRIES,
+        lean: bool = False,
+    ):
+        self._init_readiness(ready_timeout=ready_timeout)
+        self._init_rate_control(rate_controller=rate_controller, max_retries=max_retries)
+        self._init_lean(lean=lean)
+        self.max_tabs = max_tabs
+        self._playwright: "AsyncPlaywright|None" = None
+        self._browser: "AsyncBrowser|None" = None
+        self._context: "AsyncBrowserContext|None" = None
+        self._idle_tabs: "asyncio.Queue[AsyncPage]" = asyncio.Queue()
+        self._open_tabs = 0
+        self._launch_lock = asyncio.Lock()
+
+    async def load(self, url: str) -> str:
+        """ Navigate to the page in an idle tab, wait until all its products data is loaded and return its HTML.
+
+        Navigations failing with a retryable error are retried. Raises `RetryableRequestError` once out of retries.
+        """
+        from playwright.async_api import Error as PlaywrightError
+        tab = await self._acquire_tab()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self.rate_controller.request_async(url=url) as request_slot:
+                        start_time = time.perf_counter()
+                        response = await tab.goto(url, wait_until=self.wait_until)
+                        navigation_seconds = time.perf_counter() - start_time
+                        if response is not None:
+                            request_slot.record(status_code=response.status, retry_after=response.headers.get("retry-after"))
+                    if response is None or response.status not in RETRYABLE_STATUS_CODES:
+                        break
+                    error, retry_after = f"{response.status} status code", request_slot.retry_after
+                except PlaywrightError as e:
+                    error, retry_after = e.message, None
+                await asyncio.sleep(self._get_retry_delay(url=url, error=error, retry_after=retry_after, attempt=attempt))
+
+            readiness = await tab.evaluate(PAGE_READY_SCRIPT, self._get_readiness_args())
+            self._record_readiness(url=url, readiness=readiness)
+            self._record_page_stats(url=url, navigation_seconds=navigation_seconds, page_stats=await tab.evaluate(PAGE_STATS_SCRIPT))
+            return await tab.content()
+        finally:
+            self._idle_tabs.put_nowait(tab)
+
+    async def close(self) -> None:
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self._playwright, self._browser, self._context = None, None, None
+
+    async def _acquire_tab(self) -> "AsyncPage":
+        """ Get an idle tab, opening a new one (and launching the browser if needed) while under `max_tabs`."""
+        async with self._launch_lock:
+            if self._context is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._context = await self._browser.new_context(**self._get_context_options())
+                if self.lean:
+                    await self._context.route("**/*", self._route)
+
+            if self._idle_tabs.empty() and self._open_tabs < self.max_tabs:
+                self._open_tabs += 1
+                return await self._context.new_page()
+
+        return await self._idle_tabs.get()
+
+    async def _route(self, route: "AsyncRoute") -> None:
+        if self._should_block(resource_type=route.request.resource_type, url=route.request.url):
+            await route.abort()
+        else:
+            await route.continue_()
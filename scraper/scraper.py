@@ -1,24 +1,64 @@
 
+import time
+import asyncio
 import logging
-from bs4.element import Tag
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright, Page
+import statistics
+from typing import Callable
 
 from models.game import Game
+from metrics.registry import MetricsRegistry, metrics_registry
+from rate_control.rate_controller import RateController
 from parsers.price_parser import parse_price
+from parsers.product_parser import ProductCardData, get_product_parser
 from repositories.game_repository import GameRepository
+from repositories.crawl_run_repository import CrawlRunRepository, RUNNING, COMPLETED, FAILED
+from scraper.page_loader import HttpPageLoader, BrowserPageLoader, AsyncBrowserPageLoader, PAGE_READY_TIMEOUT
 
 
+MAIN_URL = "https://sandbox.oxylabs.io"
+FETCH_MODES = ("browser", "http")
+SCRIPT_MARKUP = "<script" # Static pages without products but with scripts may be rendered by them, so they are loaded again with the browser
 
 class WebScraper: 
-    def __init__(self, game_repository: GameRepository):
-        self.main_url="https://sandbox.oxylabs.io"
+    def __init__(
+        self,
+        game_repository: GameRepository,
+        concurrency: int = 1,
+        fetch_mode: str = "browser",
+        page_ready_timeout: float = PAGE_READY_TIMEOUT,
+        lean_browser: bool = False,
+        parser_backend: str|None = None,
+        crawl_run_repository: CrawlRunRepository|None = None,
+        main_url: str = MAIN_URL,
+        image_base_url: str|None = None,
+        rate_controller: RateController|None = None,
+        metrics: MetricsRegistry|None = None,
+    ):
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Invalid fetch mode '{fetch_mode}'. Valid modes are: {', '.join(FETCH_MODES)}")
+
+        self.main_url = main_url.rstrip("/")
+        self.image_base_url = (image_base_url or self.main_url).rstrip("/") # Prepended to the image paths of the pages
         self.is_last_page = False
         self.page_number = 1
+        self.concurrency = max(1, concurrency)
+        self.fetch_mode = fetch_mode
+        self.page_ready_timeout = page_ready_timeout
+        self.page_ready_times: list[float] = [] # Seconds each page loaded with the browser took to be ready
+        self.lean_browser = lean_browser # Block images, media, fonts and analytics in the browser, and stop waiting at DOMContentLoaded
+        self.browser_page_stats: list[dict] = [] # Navigation time and bytes transferred of each page loaded with the browser
+        self.blocked_requests = 0
+        self.product_parser = get_product_parser(backend=parser_backend)
+        self.on_games_saved: Callable[[list[Game]], None] | None = None
         self.game_repository = game_repository
+        self.crawl_run_repository = crawl_run_repository # Checkpoints the crawl after each saved page. None always starts from page 1
+        self.crawl_run_id: int | None = None
+        self.metrics = metrics or metrics_registry
+        # Paces the page requests of each host. Share it with the image processor to apply the same limits to pages and images
+        self.rate_controller = rate_controller or RateController(metrics=self.metrics)
         self.logger = logging.getLogger(__name__)
 
-    def scrape_web(self) -> None:
+    def scrape_web(self, on_games_saved: Callable[[list[Game]], None] | None = None) -> None:
         """ Main method of the WebScraper class. Scrape the website and store the data in the database.
         
         This method uses Playwright to navigate through the website.
@@ -28,66 +68,303 @@ class WebScraper:
         For each game, it checks if it already exists in the database. If it does, it updates the existing record; if not, it creates a new record.
 
         The method continues to the next page until there are no more pages left to scrape.
+
+        If `concurrency` is greater than 1, pages are fetched in parallel by a pool of browser tabs
+        (see `_scrape_web_concurrently()`). Otherwise, pages are fetched one at a time.
+
+        If `fetch_mode` is "http", pages are fetched with a pooled HTTP client instead of the browser,
+        falling back to the browser only for pages whose static HTML lacks the products data.
+
+        Pages loaded with the browser are read as soon as their products data is loaded, waiting at most
+        `page_ready_timeout` seconds per page. If `lean_browser` is set, the browser does not load the images, media,
+        fonts and analytics of the pages (see `LeanBrowserMixin`). The navigation time and bytes transferred of
+        each page are logged, to compare both modes.
+
+        Page requests are paced by `rate_controller`, and pages failing with a retryable error (connection error,
+        timeout, 429 or 5xx) are loaded again after a backoff (see `RateControlMixin`).
+
+        If `on_games_saved` is given, it is called with the games of each page (with their database ids set)
+        as soon as they are saved, so later stages can start processing them while the next pages are scraped.
+
+        If `crawl_run_repository` is given, the crawl is checkpointed in the database after each saved page.
+        If the last crawl did not complete (it failed or the process crashed), it is resumed from the page after
+        its last saved page. Otherwise, a new crawl starts from the first page.
+
+        The load, ready and parse times of the pages, and the number of pages and games, are recorded in the metrics.
         """
         self.logger.info("🔍 ⏳ Starting web scraping...")
-        with sync_playwright() as p:
+        self.page_ready_times = []
+        self.browser_page_stats = []
+        self.blocked_requests = 0
+        self.on_games_saved = on_games_saved
+        self.game_repository.reset_upsert_stats()
+        self._start_crawl_run()
+        try:
+            if self.concurrency > 1:
+                asyncio.run(self._scrape_web_concurrently())
+            else:
+                self._scrape_web_sequentially()
+        except BaseException:
+            self.metrics.increment("scraper_runs_total", status=FAILED)
+            self._finish_crawl_run(status=FAILED)
+            raise
+        finally:
+            self.on_games_saved = None
+            for page_ready_time in self.page_ready_times:
+                self.metrics.observe("scraper_page_ready_seconds", page_ready_time)
+            for page_stats in self.browser_page_stats:
+                self.metrics.observe("scraper_page_navigation_seconds", page_stats["navigation_seconds"])
+                self.metrics.increment("scraper_page_transfer_bytes_total", page_stats["transfer_bytes"])
+            self.metrics.increment("scraper_blocked_requests_total", self.blocked_requests)
+        self._finish_crawl_run(status=COMPLETED)
+        self.metrics.increment("scraper_runs_total", status=COMPLETED)
 
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            while not self.is_last_page:
+        if self.page_ready_times:
+            self.logger.info(
+                f"⏱️ Pages loaded with the browser: {len(self.page_ready_times)}. "
+                f"Time to be ready: median {statistics.median(self.page_ready_times):.2f}s, max {max(self.page_ready_times):.2f}s"
+            )
+        if self.browser_page_stats:
+            transfer_bytes = [page_stats["transfer_bytes"] for page_stats in self.browser_page_stats]
+            navigation_seconds = [page_stats["navigation_seconds"] for page_stats in self.browser_page_stats]
+            self.logger.info(
+                f"📦 Browser pages ({'lean' if self.lean_browser else 'full'} mode): median {statistics.median(transfer_bytes) / 1000:.1f} KB "
+                f"transferred per page ({sum(transfer_bytes) / 1_000_000:.1f} MB in total), navigation time median "
+                f"{statistics.median(navigation_seconds):.2f}s, max {max(navigation_seconds):.2f}s. Requests blocked: {self.blocked_requests}"
+            )
 
-                self.logger.info(f"🌐 Scraping and saving games to the database for page {self.page_number}...")
-                url = f"{self.main_url}/products?page={self.page_number}"
-                page.goto(url)
+        category_cache_stats = self.game_repository.get_category_cache_stats()
+        self.logger.info(
+            f"🗂️ Category cache: {category_cache_stats['hits']} hits, {category_cache_stats['misses']} misses "
+            f"({category_cache_stats['hit_rate']:.0%} hit rate)"
+        )
+        upsert_stats = self.game_repository.get_upsert_stats()
+        self.logger.info(
+            f"🧮 Games scraped: {upsert_stats['new']} new, {upsert_stats['changed']} changed, "
+            f"{upsert_stats['unchanged']} unchanged (not written)"
+        )
+        self.rate_controller.log_state()
+        self.logger.info("✅ Web scraping completed successfully.")
 
-                # Scroll to the bottom to load all products data
-                self._scroll_down_page(page=page)
+    def _start_crawl_run(self) -> None:
+        """ Start the crawl from the first page, or from the page after the last saved one if the last crawl run did not complete."""
+        self.is_last_page = False
+        self.page_number = 1
+        self.crawl_run_id = None
+        if self.crawl_run_repository is None:
+            return
 
-                html = page.content()
-                soup = BeautifulSoup(html, "html.parser")
+        resumable_run = self.crawl_run_repository.get_resumable_run()
+        if resumable_run is None:
+            self.crawl_run_id = self.crawl_run_repository.create()
+            return
 
-                # Extract all games data from the page
-                games_html = soup.find_all("div", class_="product-card")
-                for game_data in games_html:
+        self.crawl_run_id = resumable_run["id"]
+        self.page_number = resumable_run["last_completed_page"] + 1
+        self.crawl_run_repository.set_status(crawl_run_id=self.crawl_run_id, status=RUNNING)
+        self.logger.info(f"♻️ Resuming crawl run {self.crawl_run_id} from page {self.page_number}...")
 
-                    game_entity = self._scrape_game(game_data=game_data) 
-                    if not game_entity:
-                        continue
+    def _finish_crawl_run(self, status: str) -> None:
+        """ Set the final status (completed or failed) of the current crawl run."""
+        if self.crawl_run_id is None:
+            return
+
+        try:
+            self.crawl_run_repository.set_status(crawl_run_id=self.crawl_run_id, status=status)
+        except Exception as e:
+            self.logger.error(f"❌ Error setting the status of crawl run {self.crawl_run_id} to {status}: {e}")
+            if status == COMPLETED:
+                raise
+        self.crawl_run_id = None
+
+    def _scrape_web_sequentially(self) -> None:
+        """ Scrape the website one page at a time."""
+        http_loader = HttpPageLoader(rate_controller=self.rate_controller) if self.fetch_mode == "http" else None
+        browser_loader = BrowserPageLoader(ready_timeout=self.page_ready_timeout, rate_controller=self.rate_controller, lean=self.lean_browser)
+        try:
+            while not self.is_last_page:
+
+                self.logger.info(f"🌐 Scraping and saving games to the database for page {self.page_number}...")
+                url = self._get_page_url(page_number=self.page_number)
+
+                page = None
+                html = self._load_page(load=http_loader.load, url=url, fetch_mode="http") if http_loader else None
+                if html is not None:
+                    page = self._parse_page(html=html, page_number=self.page_number, is_static=True)
+                if page is None:
+                    html = self._load_page(load=browser_loader.load, url=url, fetch_mode="browser")
+                    page = self._parse_page(html=html, page_number=self.page_number)
+
+                games, self.is_last_page = page
+                self._save_games(games=games, page_number=self.page_number)
 
-                    # Check if the game already exists in the database
-                    existing_game_id = self.game_repository.get_game_id_by_website_id(website_id=game_entity.website_id)
-                    if existing_game_id:
-                        self.game_repository.update(game=game_entity, game_id=existing_game_id)
-                    else:
-                        self.game_repository.create(game=game_entity)
-                    
                 # Check if there is a next page available
-                self.is_last_page = self._check_next_page_exists(soup=soup)
                 if not self.is_last_page:
                     self.page_number+=1
 
-            browser.close()
-            self.logger.info("✅ Web scraping completed successfully.")
+        finally:
+            self.page_ready_times.extend(browser_loader.ready_times)
+            self.browser_page_stats.extend(browser_loader.page_stats)
+            self.blocked_requests += browser_loader.blocked_requests
+            browser_loader.close()
+            if http_loader:
+                http_loader.close()
 
-    def _check_next_page_exists(self, soup: BeautifulSoup) -> bool :
-        """ Check if there is a next page available in the pagination."""
-        pagination_object = soup.find("ul", class_ = "pagination")
-        next_button_object = pagination_object.find("li", class_="next disabled")
-        return bool(next_button_object)
-    
-    def _scroll_down_page(self, page:Page) -> None:
-        """ Scroll down the page."""
-        page.evaluate("""
-        async () => {
-            const step = 500;
-            for (let pos = 0; pos < document.body.scrollHeight; pos += step) {
-                window.scrollTo(0, pos);
-                await new Promise(r => setTimeout(r, 100)); // esperar 100ms entre pasos
-            }
-        }
-        """)
-    
-    def _scrape_game(self, game_data: Tag) -> Game:
+    async def _scrape_web_concurrently(self) -> None:
+        """ Scrape the website using a pool of workers that fetch pages in parallel.
+
+        Each worker takes the next page number to fetch, loads and parses it, and stores the result.
+        Parsed pages are saved to the database strictly in page order, so the database ends up exactly
+        as with the sequential path. Once a page reports that it is the last one, no worker takes a page
+        after it, and any page fetched beyond it is discarded.
+
+        Workers may fetch pages past the last one before it is known. If loading or parsing a page fails, no worker
+        takes a page after it, and the error is only raised if the page is not past the last one.
+        """
+        next_page_to_fetch = self.page_number
+        next_page_to_save = self.page_number
+        last_page_number = None
+        failed_page: tuple[int, Exception] | None = None # First page that could not be loaded or parsed, with its error
+        parsed_pages: dict[int, list[Game]] = {}
+
+        def get_pages_limit() -> int | None:
+            """ Get the last page that may need to be fetched, or None if it is not known yet."""
+            limits = [page_number for page_number in (last_page_number, failed_page and failed_page[0] - 1) if page_number is not None]
+            return min(limits) if limits else None
+
+        http_loader = HttpPageLoader(pool_size=self.concurrency, rate_controller=self.rate_controller) if self.fetch_mode == "http" else None
+        browser_loader = AsyncBrowserPageLoader(
+            max_tabs=self.concurrency, ready_timeout=self.page_ready_timeout, rate_controller=self.rate_controller, lean=self.lean_browser
+        )
+
+        def is_past_last_page(page_number: int) -> bool:
+            return last_page_number is not None and page_number > last_page_number
+
+        async def crawl_worker() -> None:
+            nonlocal next_page_to_fetch, next_page_to_save, last_page_number, failed_page
+
+            while (pages_limit := get_pages_limit()) is None or next_page_to_fetch <= pages_limit:
+                page_number = next_page_to_fetch
+                next_page_to_fetch += 1
+
+                self.logger.info(f"🌐 Scraping page {page_number}...")
+                url = self._get_page_url(page_number=page_number)
+
+                try:
+                    page = None
+                    html = await asyncio.to_thread(self._load_page, load=http_loader.load, url=url, fetch_mode="http") if http_loader else None
+                    if html is not None and not is_past_last_page(page_number):
+                        page = self._parse_page(html=html, page_number=page_number, is_static=True)
+                    if page is None and not is_past_last_page(page_number):
+                        start_time = time.perf_counter()
+                        html = await browser_loader.load(url=url)
+                        self._record_page_load(fetch_mode="browser", seconds=time.perf_counter() - start_time, is_loaded=True)
+                        if not is_past_last_page(page_number):
+                            page = self._parse_page(html=html, page_number=page_number)
+
+                    if page is None:
+                        continue # Past the last page, found while this one was being loaded
+                    games, is_last_page = page
+                except Exception as e:
+                    if is_past_last_page(page_number):
+                        continue
+                    self.logger.warning(f"⚠️ Error scraping page {page_number}: {e}. No page after it will be fetched.")
+                    if failed_page is None or page_number < failed_page[0]:
+                        failed_page = (page_number, e)
+                    continue
+
+                if is_last_page and (last_page_number is None or page_number < last_page_number):
+                    last_page_number = page_number
+                parsed_pages[page_number] = games
+
+                # Save every consecutive page that is ready, keeping the page order
+                while next_page_to_save in parsed_pages and (last_page_number is None or next_page_to_save <= last_page_number):
+                    self.logger.info(f"💾 Saving games to the database for page {next_page_to_save}...")
+                    self._save_games(games=parsed_pages.pop(next_page_to_save), page_number=next_page_to_save)
+                    self.page_number = next_page_to_save
+                    next_page_to_save += 1
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                for _ in range(self.concurrency):
+                    task_group.create_task(crawl_worker())
+        finally:
+            self.page_ready_times.extend(browser_loader.ready_times)
+            self.browser_page_stats.extend(browser_loader.page_stats)
+            self.blocked_requests += browser_loader.blocked_requests
+            await browser_loader.close()
+            if http_loader:
+                http_loader.close()
+
+        # Errors of pages past the last one are ignored, as all the pages of the website are saved
+        if failed_page is not None and (last_page_number is None or failed_page[0] <= last_page_number):
+            raise failed_page[1]
+        self.is_last_page = True
+
+    def _get_page_url(self, page_number: int) -> str:
+        """ Build the URL of a listing page."""
+        return f"{self.main_url}/products?page={page_number}"
+
+    def _load_page(self, load: Callable[..., str | None], url: str, fetch_mode: str) -> str | None:
+        """ Load a page with the given loader, recording its load time. Returns None if the loader can not read the page."""
+        start_time = time.perf_counter()
+        html = load(url=url)
+        self._record_page_load(fetch_mode=fetch_mode, seconds=time.perf_counter() - start_time, is_loaded=html is not None)
+        return html
+
+    def _record_page_load(self, fetch_mode: str, seconds: float, is_loaded: bool) -> None:
+        """ Record the load time of a page. Pages the loader could not read count as fallbacks to the browser."""
+        self.metrics.observe("scraper_page_load_seconds", seconds, fetch=fetch_mode)
+        self.metrics.increment("scraper_pages_total" if is_loaded else "scraper_page_fallbacks_total", fetch=fetch_mode)
+
+    def _parse_page(self, html: str, page_number: int, is_static: bool = False) -> tuple[list[Game], bool] | None:
+        """ Parse a listing page and return its games and whether it is the last page.
+
+        A page without products nor pagination, after the first one, is past the last page: it is treated as an empty last page.
+        Any other page without pagination was not rendered as expected (e.g. it timed out), so an error is raised
+        to mark the run as failed, and resume it from this page.
+
+        With `is_static` (HTML as served over HTTP, without running its scripts), returns None if the page has no products
+        and is not past the last page (it has pagination, is the first page or has scripts), as its products are rendered by
+        scripts and it must be loaded with the browser.
+        """
+        with self.metrics.timer("scraper_page_parse_seconds"):
+            page_data = self.product_parser.parse(html=html)
+
+            if is_static and not page_data.cards and (page_data.has_pagination or page_number == 1 or SCRIPT_MARKUP in html.lower()):
+                self.logger.info(f"Page {page_number} has no products in its static HTML. Falling back to the browser.")
+                self.metrics.increment("scraper_page_fallbacks_total", fetch="http")
+                return None
+
+            if not page_data.has_pagination:
+                if page_data.cards or page_number == 1:
+                    raise Exception(f"Page {page_number} without pagination detected.")
+                self.logger.info(f"Page {page_number} has no products nor pagination. Treating it as past the last page.")
+                return [], True
+
+            # Extract all games data from the page
+            games = []
+            for card_data in page_data.cards:
+                game_entity = self._scrape_game(card_data=card_data)
+                if game_entity:
+                    games.append(game_entity)
+
+        self.metrics.increment("scraper_games_parsed_total", len(games))
+        self.metrics.increment("scraper_games_skipped_total", len(page_data.cards) - len(games))
+        return games, page_data.is_last_page
+
+    def _save_games(self, games: list[Game], page_number: int) -> None:
+        """ Create or update the given games (all games of a page) in the database, in a single transaction.
+
+        Once saved, the page is checkpointed as the last completed page of the crawl run.
+        """
+        self.game_repository.upsert_many(games=games)
+        if self.crawl_run_id is not None:
+            self.crawl_run_repository.update_last_completed_page(crawl_run_id=self.crawl_run_id, page_number=page_number)
+        if self.on_games_saved:
+            self.on_games_saved([game for game in games if game.id is not None])
+
+    def _scrape_game(self, card_data: ProductCardData) -> Game:
         """ Scrape data for a single game and return a Game entity.
         
         For each game, it extracts:
@@ -100,26 +377,23 @@ class WebScraper:
         - Highest resolution image URL
         """
         try:
-            game_url, game_id = self._get_id_and_url(game_object=game_data)
-            game_name = self._get_name(game_object=game_data)
+            game_url, game_id = self._get_id_and_url(product_path=card_data.href)
+            game_name = card_data.title
             if not game_name:
                 raise Exception("Game without name detected.")
-            game_price = self._get_price(game_object=game_data)
+            game_price = self._get_price(price_str=card_data.price)
             if game_price is None:
                 raise Exception("Game without price detected.")
-            game_description = self._get_description(game_object=game_data)
-            game_stock = self._has_stock(game_object=game_data)
-            game_categories = self._get_categories_name(game_object=game_data)
-            game_highest_resolution_image_url = self._get_highest_resolution_image_url(game_object=game_data)
+            game_highest_resolution_image_url = self._get_highest_resolution_image_url(srcset=card_data.srcset)
 
             game_entity = Game(
                 website_id=game_id,
                 name=game_name,
-                description=game_description,
+                description=card_data.description,
                 price=game_price,
-                categories=game_categories,
+                categories=card_data.categories,
                 image_url=game_highest_resolution_image_url,
-                has_stock=game_stock,
+                has_stock=not card_data.is_out_of_stock,
                 url=game_url
             )
             return game_entity
@@ -128,74 +402,35 @@ class WebScraper:
             self.logger.error(f"❌ Error during scraping game data: {e}. Skipping....")
             return None
     
-    def _get_id_and_url(self, game_object: Tag) -> tuple[str|None, int|None]:
-        """ Extract the URL and ID of the game from the game data object."""
+    def _get_id_and_url(self, product_path: str|None) -> tuple[str|None, int|None]:
+        """ Get the URL and ID of the game from the path of its product page."""
         try:
-            header_object = game_object.find("a", class_="card-header")
-
-            product_path = header_object.get('href')
             game_url = self.main_url + product_path
             game_id = product_path.split("/")[-1]
             return game_url, int(game_id)
         except Exception as e:
-            self.logger.warning(f"⚠️ Error extracting name: {e}")
+            self.logger.warning(f"⚠️ Error extracting URL and ID: {e}")
             return None, None
-    
-    def _get_name(self, game_object: Tag) -> str|None:
-        """Extract the name of the game from the game data object."""
-        try:
-            title_object = game_object.find("h4", class_="title")
-            return title_object.text
-        except Exception as e:
-            self.logger.warning(f"⚠️ Error extracting name: {e}")
-            return None
-    
-    def _get_description(self, game_object: Tag) -> str|None:
-        """ Extract the description of the game from the game data object."""
-        try:
-            description_object = game_object.find("p", class_="description")
-            return description_object.text
-        except Exception as e:
-            self.logger.warning(f"⚠️ Error extracting description: {e}")
-            return None
 
-    def _get_price(self, game_object: Tag) -> float|None:
-        """ Extract the price of the game from the game data object."""
+    def _get_price(self, price_str: str|None) -> float|None:
+        """ Get the price of the game from its price text."""
         try:
-            price_object = game_object.find("div", class_="price-wrapper")
-            price_str = price_object.text
             return parse_price(price_str)
         except Exception as e:
             self.logger.warning(f"⚠️ Error extracting price: {e}")
             return None
     
-    def _has_stock(self, game_object: Tag) -> bool:
-        """ Check if the game is in stock from the game data object."""
-        has_stock_object = game_object.find("p", class_="out-of-stock")
-        return has_stock_object is None
-    
-    def _get_categories_name(self, game_object: Tag) -> list[str|None]:
-        """ Extract the categories names of the game from the game data object."""
-        categories_object = game_object.find("p", class_="category")
-
-        if categories_object:
-            category_list = [category.text.strip().replace('"', '') for category in categories_object.find_all("span") if category.text.strip()]
-            return category_list
-        return []
-    
-    def _get_highest_resolution_image_url(self, game_object: Tag) -> str|None:
-        """ Extract the highest resolution image URL of the game from the game data object.
+    def _get_highest_resolution_image_url(self, srcset: str|None) -> str|None:
+        """ Get the highest resolution image URL of the game from the 'srcset' attribute of its image.
         
         It parses the 'srcset' attribute of the image tag to get all available image URLs and their widths,
         then selects the one with the highest width.
         """
         try:
-            product_images_attributes = game_object.find("img", class_="image")
-
-            all_images_links = product_images_attributes.get("srcset").split(", ")
+            all_images_links = srcset.split(", ")
             ordered_images_link = self._order_list_of_images_url(all_images_links)
             highest_resolution_image_path = ordered_images_link[0][0]
-            highest_resolution_image_url = self.main_url + highest_resolution_image_path
+            highest_resolution_image_url = self.image_base_url + highest_resolution_image_path
             return highest_resolution_image_url
         except Exception as e:
             self.logger.warning(f"⚠️ Error extracting highest resolution image URL: {e}")
@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+
+from scraper.scraper import WebScraper
+from parsers.product_parser import BeautifulSoupProductParser, LxmlProductParser, get_product_parser
+
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures"
+MAIN_URL = "https://example.com"
+
+@pytest.fixture
+def listing_page_html() -> str:
+    return (FIXTURES_PATH / "listing_page.html").read_text(encoding="utf-8")
+
+def parse_games(parser_backend: str, html: str):
+    """ Parse the listing page into Game entities, as the scraper does."""
+    scraper = WebScraper(game_repository=None, parser_backend=parser_backend, main_url=MAIN_URL)
+    return scraper._parse_page(html=html, page_number=1)
+
+
+def test_backends_parse_the_same_cards(listing_page_html):
+    bs4_page_data = BeautifulSoupProductParser().parse(html=listing_page_html)
+    lxml_page_data = LxmlProductParser().parse(html=listing_page_html)
+
+    assert len(bs4_page_data.cards) == 4
+    assert lxml_page_data == bs4_page_data
+
+def test_backends_build_the_same_games(listing_page_html):
+    bs4_games, bs4_is_last_page = parse_games(parser_backend="bs4", html=listing_page_html)
+    lxml_games, lxml_is_last_page = parse_games(parser_backend="lxml", html=listing_page_html)
+
+    assert [game.website_id for game in bs4_games] == [1, 2, 3] # The card without price is skipped
+    assert lxml_games == bs4_games
+    assert bs4_is_last_page is lxml_is_last_page is False
+
+def test_games_fields(listing_page_html):
+    games, _ = parse_games(parser_backend="lxml", html=listing_page_html)
+    zelda, mario, tetris = games
+
+    assert zelda.description == "As a young boy, Link is tricked by Ganondorf & sets out to stop him."
+    assert zelda.categories == ["Action Adventure", "Fantasy"]
+    assert zelda.image_url == f"{MAIN_URL}/assets/action-adventure_800.jpg"
+    assert zelda.has_stock
+    assert mario.name == "Super Mario Galaxy 2"
+    assert mario.categories == ["Platformer", "Puzzle"]
+    assert mario.price == 10.5
+    assert not mario.has_stock
+    assert mario.image_url == f"{MAIN_URL}/assets/platformer_500.jpg"
+    assert tetris.description is None
+    assert tetris.image_url is None
+
+@pytest.mark.parametrize("parser_backend", ["bs4", "lxml"])
+def test_last_page(parser_backend):
+    html = '<div class="product-card"></div><ul class="pagination"><li class="next disabled"><a>Next</a></li></ul>'
+    page_data = get_product_parser(backend=parser_backend).parse(html=html)
+    assert page_data.has_pagination and page_data.is_last_page
+
+@pytest.mark.parametrize("parser_backend", ["bs4", "lxml"])
+def test_page_without_pagination_is_the_last_one(parser_backend):
+    page_data = get_product_parser(backend=parser_backend).parse(html="<html><body><p>No products found</p></body></html>")
+    assert page_data.cards == []
+    assert not page_data.has_pagination and page_data.is_last_page
+
+def test_scraper_treats_page_without_products_nor_pagination_as_past_the_last_one():
+    scraper = WebScraper(game_repository=None, main_url=MAIN_URL)
+    assert scraper._parse_page(html="<html><body><p>No products found</p></body></html>", page_number=5) == ([], True)
+
+@pytest.mark.parametrize("html, page_number", [
+    ('<div class="product-card"><h4>Tetris</h4></div>', 2), # Products without pagination: not fully rendered
+    ("<html><body><p>No products found</p></body></html>", 1), # The first page always has products
+])
+def test_scraper_fails_on_page_without_pagination(html, page_number):
+    scraper = WebScraper(game_repository=None, main_url=MAIN_URL)
+    with pytest.raises(Exception, match="without pagination"):
+        scraper._parse_page(html=html, page_number=page_number)
+
+@pytest.mark.parametrize("html, page_number", [
+    ('<style>.product-card {}</style><div id="root"></div><script src="/product-card.js"></script>', 2), # Class names only in CSS and scripts
+    ('<div id="root"></div><ul class="pagination"><li class="next"><a>Next</a></li></ul>', 2), # Pagination rendered by the server
+    ("<html><body><p>No products found</p></body></html>", 1),
+])
+def test_scraper_loads_static_page_without_products_with_the_browser(html, page_number):
+    scraper = WebScraper(game_repository=None, main_url=MAIN_URL)
+    assert scraper._parse_page(html=html, page_number=page_number, is_static=True) is None
+
+def test_backends_differ_on_blocks_inside_paragraphs():
+    """ Known divergence: HTML does not allow a <div> inside a <p>. libxml2 closes the paragraph before the div,
+    while html.parser keeps the div (and its text) inside it."""
+    html = '<div class="product-card"><p class="description">para <div class="price-wrapper">2,00 €</div></p></div>'
+
+    assert BeautifulSoupProductParser().parse(html=html).cards[0].description == "para 2,00 €"
+    assert LxmlProductParser().parse(html=html).cards[0].description == "para "